@@ -1,12 +1,17 @@
 import nonebot
 from nonebot.adapters.onebot.v11 import Adapter as OneBotV11Adapter
 
-nonebot.init()
 
-driver = nonebot.get_driver()
-driver.register_adapter(OneBotV11Adapter)
+def main() -> None:
+    nonebot.init()
 
-nonebot.load_plugin("qbot.plugin")
+    driver = nonebot.get_driver()
+    driver.register_adapter(OneBotV11Adapter)
 
-if __name__ == "__main__":
+    nonebot.load_plugin("qbot.plugin")
     nonebot.run()
+
+
+# Render workers are spawned and re-import this module; keep setup in main().
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,16 @@
 __all__ = [
     "analyzer",
     "bucketizer",
+    "chartcache",
     "collector",
     "config",
     "parser",
     "plotter",
     "ranker",
+    "renderpool",
     "repository",
+    "roster",
     "service",
+    "sharding",
+    "usage",
 ]
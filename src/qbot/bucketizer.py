@@ -1,35 +1,167 @@
 from __future__ import annotations
 
-from collections import Counter
+import hashlib
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+
+import numpy as np
 
 from qbot.models import BucketCount, ParsedMember
 
+SCORE_MIN = 350
+SCORE_MAX = 500
+DISTRIBUTION_WIDTHS = (1, 5, 10)
+
 
-def compute_upper_bound(scores: list[int]) -> int | None:
+def compute_upper_bound(scores: Sequence[int]) -> int | None:
     if not scores:
         return None
     return min(500, max(scores) + 5)
 
 
+@dataclass(frozen=True, slots=True)
+class ScoreBins:
+    """Fixed-width bins from 350 with counts and counts of scores >= each bin start."""
+
+    width: int
+    starts: np.ndarray
+    counts: np.ndarray
+    at_least: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def head(self, n: int) -> ScoreBins:
+        return ScoreBins(self.width, self.starts[:n], self.counts[:n], self.at_least[:n])
+
+
+class ScoreDistribution:
+    """Score histogram at several bin widths, shared by the summary and the charts.
+
+    All widths and their cumulative arrays are derived together from one
+    per-score count array over 350–500.
+    """
+
+    __slots__ = ("per_score", "total", "max_score", "upper_bound", "_bins")
+
+    def __init__(self, per_score: np.ndarray, widths: Iterable[int] = DISTRIBUTION_WIDTHS) -> None:
+        per_score = np.asarray(per_score, dtype=np.int64)
+        if per_score.shape != (SCORE_MAX - SCORE_MIN + 1,):
+            raise ValueError("ScoreDistribution needs one count per score in 350-500")
+        self.per_score = per_score
+        self.total = int(per_score.sum())
+        nonzero = np.flatnonzero(per_score)
+        self.max_score = SCORE_MIN + int(nonzero[-1]) if len(nonzero) else None
+        self.upper_bound = min(SCORE_MAX, self.max_score + 5) if self.max_score is not None else None
+        self._bins: dict[int, ScoreBins] = {}
+        for width in widths:
+            offsets = np.arange(0, len(per_score), width)
+            counts = np.add.reduceat(per_score, offsets)
+            at_least = np.cumsum(counts[::-1])[::-1]
+            self._bins[width] = ScoreBins(width, SCORE_MIN + offsets, counts, at_least)
+
+    def __reduce__(self) -> tuple[type[ScoreDistribution], tuple[np.ndarray, tuple[int, ...]]]:
+        # Ship only the counts to render workers; the bins are cheap to rebuild.
+        return (ScoreDistribution, (self.per_score, tuple(self._bins)))
+
+    def fingerprint(self) -> bytes:
+        """Stable digest of the per-score counts; equal for equal distributions."""
+        return hashlib.blake2b(self.per_score.astype("<u4").tobytes(), digest_size=16).digest()
+
+    def bins(self, width: int) -> ScoreBins:
+        """Bins over the whole 350–500 domain."""
+        return self._bins[width]
+
+    def occupied(self, width: int) -> ScoreBins:
+        """Bins from 350 up to the one holding the highest score."""
+        if self.max_score is None:
+            return self._bins[width].head(0)
+        return self._bins[width].head((self.max_score - SCORE_MIN) // width + 1)
+
+    def buckets(self, width: int = 5) -> list[BucketCount]:
+        """Bins from 350 up to `upper_bound`, the last one clipped to it."""
+        if self.upper_bound is None:
+            return []
+        bins = self._bins[width].head((self.upper_bound - SCORE_MIN) // width + 1)
+        return [
+            BucketCount(start=start, end=min(start + width - 1, self.upper_bound), count=count)
+            for start, count in zip(bins.starts.tolist(), bins.counts.tolist(), strict=True)
+        ]
+
+
+class LiveDistribution:
+    """Per-score counts kept current by member deltas instead of rebuilt.
+
+    `add`, `remove` and `change` are O(1); `snapshot` copies the 151 counts
+    into an immutable `ScoreDistribution`. A None score means "no valid
+    score", so `change(None, 420)` is an add and `change(420, None)` a remove.
+    """
+
+    __slots__ = ("_counts", "total")
+
+    def __init__(self, counts: Sequence[int] | None = None) -> None:
+        self._counts = list(counts) if counts is not None else [0] * (SCORE_MAX - SCORE_MIN + 1)
+        if len(self._counts) != SCORE_MAX - SCORE_MIN + 1:
+            raise ValueError("LiveDistribution needs one count per score in 350-500")
+        self.total = sum(self._counts)
+
+    @classmethod
+    def from_scores(cls, scores: Iterable[int]) -> LiveDistribution:
+        live = cls()
+        for score in scores:
+            live.add(score)
+        return live
+
+    @property
+    def counts(self) -> tuple[int, ...]:
+        return tuple(self._counts)
+
+    def add(self, score: int) -> None:
+        self._counts[_slot(score)] += 1
+        self.total += 1
+
+    def remove(self, score: int) -> None:
+        slot = _slot(score)
+        if self._counts[slot] == 0:
+            raise ValueError(f"no member with score {score} to remove")
+        self._counts[slot] -= 1
+        self.total -= 1
+
+    def change(self, old: int | None, new: int | None) -> None:
+        if old == new:
+            return
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    def snapshot(self) -> ScoreDistribution:
+        return ScoreDistribution(np.array(self._counts, dtype=np.int64))
+
+    def verify(self, scores: Sequence[int] | np.ndarray) -> bool:
+        """True when the counts equal a full rebuild from `scores`."""
+        rebuilt = build_distribution(scores).per_score
+        return bool(np.array_equal(rebuilt, np.asarray(self._counts)))
+
+
+def _slot(score: int) -> int:
+    if not SCORE_MIN <= score <= SCORE_MAX:
+        raise ValueError(f"score {score} outside 350-500")
+    return score - SCORE_MIN
+
+
+def build_distribution(scores: Sequence[int] | np.ndarray) -> ScoreDistribution:
+    values = np.asarray(scores, dtype=np.int64)
+    values = values[(values >= SCORE_MIN) & (values <= SCORE_MAX)]
+    return ScoreDistribution(
+        np.bincount(values - SCORE_MIN, minlength=SCORE_MAX - SCORE_MIN + 1)
+    )
+
+
 def build_buckets(members: list[ParsedMember]) -> tuple[list[BucketCount], int | None]:
-    if not members:
-        return [], None
-
-    scores = [m.score for m in members]
-    upper = compute_upper_bound(scores)
-    assert upper is not None
-
-    counts = Counter()
-    for score in scores:
-        start = ((score - 350) // 5) * 5 + 350
-        end = min(start + 4, upper)
-        counts[(start, end)] += 1
-
-    buckets: list[BucketCount] = []
-    cur = 350
-    while cur <= upper:
-        end = min(cur + 4, upper)
-        buckets.append(BucketCount(start=cur, end=end, count=counts.get((cur, end), 0)))
-        cur += 5
-
-    return buckets, upper
+    return build_score_buckets([m.score for m in members])
+
+
+def build_score_buckets(scores: Sequence[int]) -> tuple[list[BucketCount], int | None]:
+    distribution = build_distribution(scores)
+    return distribution.buckets(5), distribution.upper_bound
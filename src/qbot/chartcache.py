@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+from qbot.bucketizer import ScoreDistribution
+from qbot.plotter import ImageBudget
+
+# Bump when a renderer change alters the image for the same inputs.
+CHART_VERSION = 1
+# Archive file suffix by leading magic bytes.
+_SUFFIXES = ((b"\x89PNG", ".png"), (b"RIFF", ".webp"), (b"\xff\xd8", ".jpg"), (b"", ".bin"))
+
+
+def dashboard_key(
+    distribution: ScoreDistribution,
+    points: list[tuple[datetime, int]],
+    group_id: int,
+    collected_at: datetime,
+    window_hours: int,
+    font_path: str | None,
+    budget: ImageBudget | None = None,
+    renderer: str = "matplotlib",
+) -> str:
+    """Digest of everything the dashboard renderers draw from."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"dashboard:{CHART_VERSION}:{renderer}:{group_id}:{window_hours}:{font_path}".encode())
+    h.update(f":{collected_at.isoformat()}:{budget!r}:".encode())
+    h.update(distribution.fingerprint())
+    for at, count in points:
+        h.update(f"{at.isoformat()}={count};".encode())
+    return h.hexdigest()
+
+
+class ChartCache:
+    """Encoded chart images keyed by a digest of their render inputs.
+
+    Recently used images stay in memory up to `max_bytes`. With a
+    `directory`, images are also archived on disk, oldest first evicted once
+    the archive passes `max_disk_bytes`, so a restart can still skip
+    rendering. Without one the cache is memory-only.
+    """
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        max_bytes: int = 32 * 1024 * 1024,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._disk_size: int | None = None
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, key: str) -> bytes | None:
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            return data
+        if self.directory is None:
+            return None
+        for _, suffix in _SUFFIXES:
+            try:
+                data = self._path_for(key, suffix).read_bytes()
+            except FileNotFoundError:
+                continue
+            self._remember(key, data)
+            return data
+        return None
+
+    def put(self, key: str, data: bytes) -> None:
+        self._remember(key, data)
+        if self.directory is None or len(data) > self.max_disk_bytes:
+            return
+        path = self._path_for(key, _suffix(data))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = self._archive_size()
+        if path.exists():
+            size -= path.stat().st_size
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._disk_size = size + len(data)
+        if self._disk_size > self.max_disk_bytes:
+            self._trim_archive(keep=path)
+
+    def prune(self, max_age_days: int) -> int:
+        """Delete archived images not written for `max_age_days`."""
+        if self.directory is None or not self.directory.exists():
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for path in self._archived():
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        self._disk_size = None
+        return removed
+
+    def _path_for(self, key: str, suffix: str) -> Path:
+        assert self.directory is not None
+        return self.directory / f"{key}{suffix}"
+
+    def _archived(self) -> list[Path]:
+        assert self.directory is not None
+        suffixes = {suffix for _, suffix in _SUFFIXES}
+        return [p for p in self.directory.iterdir() if p.suffix in suffixes]
+
+    def _archive_size(self) -> int:
+        # Measured once, then kept current by put and _trim_archive.
+        assert self.directory is not None
+        if self._disk_size is None:
+            self._disk_size = sum(p.stat().st_size for p in self._archived())
+        return self._disk_size
+
+    def _trim_archive(self, keep: Path) -> None:
+        assert self.directory is not None
+        files = []
+        for path in self._archived():
+            stat = path.stat()
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort(key=lambda item: item[0])
+        size = sum(item[1] for item in files)
+        for _, file_size, path in files:
+            if size <= self.max_disk_bytes:
+                break
+            if path != keep:
+                path.unlink(missing_ok=True)
+                size -= file_size
+        self._disk_size = size
+
+    def _remember(self, key: str, data: bytes) -> None:
+        self._forget(key)
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _forget(self, key: str) -> None:
+        data = self._entries.pop(key, None)
+        if data is not None:
+            self._size -= len(data)
+
+
+def _suffix(data: bytes) -> str:
+    return next(suffix for magic, suffix in _SUFFIXES if data.startswith(magic))
@@ -1,13 +1,96 @@
 from __future__ import annotations
 
+import asyncio
 from collections.abc import Sequence
-from typing import Any
+from time import monotonic
+from typing import Any, Protocol, runtime_checkable
 
 from nonebot.adapters.onebot.v11 import Bot
 
 
-async def get_group_members(bot: Bot, group_id: int) -> Sequence[dict[str, Any]]:
-    data = await bot.call_api("get_group_member_list", group_id=group_id)
+async def get_group_members(
+    bot: Bot, group_id: int, timeout: float | None = None
+) -> Sequence[dict[str, Any]]:
+    data = await asyncio.wait_for(
+        bot.call_api("get_group_member_list", group_id=group_id), timeout
+    )
     if isinstance(data, list):
         return data
     return []
+
+
+class MemberSource(Protocol):
+    async def get(self, bot: Bot, group_id: int) -> Sequence[dict[str, Any]]: ...
+
+    def version(self, group_id: int) -> int: ...
+
+
+@runtime_checkable
+class MemberJournal(Protocol):
+    """A member source that can replay member changes between versions."""
+
+    def changes_since(
+        self, group_id: int, version: int
+    ) -> list[tuple[dict[str, Any] | None, dict[str, Any] | None]] | None: ...
+
+
+class MemberListCache:
+    """Per-group member list cache with a TTL and single-flight fetching.
+
+    Concurrent callers for the same group share one `get_group_member_list`
+    call. Returned lists are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, timeout_seconds: float | None = None) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self._entries: dict[int, tuple[float, tuple[dict[str, Any], ...]]] = {}
+        self._inflight: dict[int, asyncio.Task[tuple[dict[str, Any], ...]]] = {}
+        self._versions: dict[int, int] = {}
+        self._invalidations = 0
+
+    async def get(self, bot: Bot, group_id: int) -> Sequence[dict[str, Any]]:
+        entry = self._entries.get(group_id)
+        if entry is not None and monotonic() < entry[0]:
+            return entry[1]
+
+        task = self._inflight.get(group_id)
+        if task is None:
+            task = asyncio.create_task(self._load(bot, group_id))
+            task.add_done_callback(_consume_exception)
+            self._inflight[group_id] = task
+        # Shield so one caller being cancelled does not abort the shared fetch.
+        return await asyncio.shield(task)
+
+    def version(self, group_id: int) -> int:
+        """Counter bumped every time a fresh member list is stored for the group."""
+        return self._versions.get(group_id, 0)
+
+    def invalidate(self, group_id: int | None = None) -> None:
+        self._invalidations += 1
+        if group_id is None:
+            self._entries.clear()
+            self._inflight.clear()
+            return
+        self._entries.pop(group_id, None)
+        self._inflight.pop(group_id, None)
+
+    async def _load(self, bot: Bot, group_id: int) -> tuple[dict[str, Any], ...]:
+        current = asyncio.current_task()
+        invalidations = self._invalidations
+        try:
+            members = tuple(await get_group_members(bot, group_id, self.timeout_seconds))
+        finally:
+            if self._inflight.get(group_id) is current:
+                del self._inflight[group_id]
+        # A fetch that raced with invalidate() still answers its waiters, but
+        # must not repopulate the cache with a possibly stale list.
+        if invalidations == self._invalidations:
+            self._entries[group_id] = (monotonic() + self.ttl_seconds, members)
+            self._versions[group_id] = self.version(group_id) + 1
+        return members
+
+
+def _consume_exception(task: asyncio.Task[Any]) -> None:
+    if not task.cancelled():
+        task.exception()
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Literal
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
+from qbot.models import CutoffPolicy
+from qbot.plotter import ImageBudget
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -18,8 +21,27 @@ class Settings(BaseSettings):
     enabled_groups: Annotated[list[str], NoDecode] = Field(default_factory=list)
     zheji_group_id: int = 924534632
     db_path: Path = Path("data/qbot.sqlite3")
+    db_reader_pool_size: int = 2
+    usage_batch_size: int = 100
+    usage_flush_interval_seconds: float = 2.0
     history_window_hours: int = 24
+    unchanged_report: Literal["send", "text", "skip"] = "send"
+    member_cache_ttl_seconds: float = 60.0
+    member_fetch_timeout_seconds: float = 10.0
+    bot_concurrency: int = 2
+    live_roster: bool = False
+    roster_resync_minutes: int = 30
     retention_days: int = 30
+    render_workers: int = 1
+    render_queue_size: int = 32
+    render_warm_up: bool = True
+    renderer: Literal["matplotlib", "pillow"] = "matplotlib"
+    chart_cache_mb: int = 32
+    chart_archive_mb: int = 256
+    image_budget: ImageBudget = Field(default_factory=ImageBudget)
+    profile_schemas: dict[str, str] = Field(default_factory=dict)
+    cutoffs: CutoffPolicy = Field(default_factory=CutoffPolicy)
+    group_cutoffs: dict[int, CutoffPolicy] = Field(default_factory=dict)
     font_path: str | None = None
 
     @field_validator("enabled_groups", mode="before")
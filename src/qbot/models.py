@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
 
@@ -26,3 +26,46 @@ class SnapshotMeta:
     valid_member_count: int
     max_score: int
     upper_bound: int
+    fingerprint: bytes | None = None
+
+
+@dataclass(slots=True)
+class TrendRollup:
+    period_start: datetime
+    min_count: int
+    max_count: int
+    last_count: int
+    avg_count: float
+    last_at: datetime
+
+
+@dataclass(slots=True)
+class MemberRank:
+    user_id: int
+    score: int
+    best_rank: int
+    worst_rank: int
+    tie_count: int
+    percentile: float
+
+
+@dataclass(frozen=True, slots=True)
+class CutoffPolicy:
+    """Ranks whose cutoff scores and top-N averages a group reports."""
+
+    ranks: tuple[int, ...] = (202, 263, 273, 280)
+    averages: tuple[int, ...] = (202, 263, 273)
+    retest_rank: int = 263
+    target_rank: int = 202
+
+
+@dataclass(slots=True)
+class Cutoffs:
+    scores: dict[int, int | None] = field(default_factory=dict)
+    averages: dict[int, float | None] = field(default_factory=dict)
+
+    def score_at(self, rank: int) -> int | None:
+        return self.scores.get(rank)
+
+    def average_of(self, n: int) -> float | None:
+        return self.averages.get(n)
@@ -1,10 +1,21 @@
 from __future__ import annotations
 
 import re
+from array import array
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
 
 from qbot.models import ParsedMember
 
-PATTERN = re.compile(r"^\s*(\d{1,3})\s*[-—]\s*(.+?)\s*$")
+PATTERN = re.compile(r"^\s*(?P<score>\d{1,3})\s*[-—]\s*(?P<name>.+?)\s*$")
+ZHEJI_PATTERN = re.compile(
+    r"^\s*26\s*[-—]\s*[^-—]+\s*[-—]\s*(?P<score>\d{3})\s*[-—]\s*(?P<name>.+?)\s*$"
+)
+
+# Distinct card strings kept in the parse memo; a few groups of 3000 fit easily.
+CARD_MEMO_SIZE = 16384
 
 
 def parse_member_card(card_or_nickname: str) -> ParsedMember | None:
@@ -25,3 +36,137 @@ def parse_member_card(card_or_nickname: str) -> ParsedMember | None:
         return None
 
     return ParsedMember(score=score, name=name, raw_card=text)
+
+
+def member_profile_text(member: Mapping[str, Any]) -> str:
+    card = str(member.get("card") or "").strip()
+    if card:
+        return card
+    return str(member.get("nickname") or "").strip()
+
+
+@dataclass(slots=True)
+class MemberScores:
+    """Parallel arrays of user ids and scores for members with a valid card."""
+
+    user_ids: array = field(default_factory=lambda: array("q"))
+    scores: array = field(default_factory=lambda: array("H"))
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def score_of(self, user_id: int) -> int | None:
+        try:
+            return self.scores[self.user_ids.index(user_id)]
+        except ValueError:
+            return None
+
+
+ZHERUAN = "zheruan"
+ZHEJI = "zheji"
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileSchema:
+    """A profile format; `pattern` must capture the score as group `score`.
+
+    A `name` group, when present, must capture a non-blank name.
+    """
+
+    name: str
+    pattern: re.Pattern[str]
+    min_score: int = 350
+    max_score: int = 500
+
+
+BUILTIN_SCHEMAS: tuple[ProfileSchema, ...] = (
+    ProfileSchema(ZHERUAN, PATTERN),
+    ProfileSchema(ZHEJI, ZHEJI_PATTERN),
+)
+
+
+class ProfileClassifier:
+    """Matches a profile text against every schema in one memoized call.
+
+    `classify` returns one score (or None) per schema, in `names` order.
+    Texts matching no schema all share one tuple, so a miss allocates nothing.
+    """
+
+    def __init__(
+        self,
+        schemas: Sequence[ProfileSchema] = BUILTIN_SCHEMAS,
+        memo_size: int = CARD_MEMO_SIZE,
+    ) -> None:
+        names = [schema.name for schema in schemas]
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicate profile schema names: {names}")
+        for schema in schemas:
+            if "score" not in schema.pattern.groupindex:
+                raise ValueError(f"profile schema {schema.name!r} has no `score` group")
+        self.schemas = tuple(schemas)
+        self.names = tuple(names)
+        self._miss: tuple[int | None, ...] = (None,) * len(self.schemas)
+        self.classify = lru_cache(maxsize=memo_size)(self._classify)
+
+    def index(self, name: str) -> int:
+        return self.names.index(name)
+
+    def score(self, text: str, name: str) -> int | None:
+        return self.classify(text)[self.index(name)]
+
+    def scan(
+        self,
+        members: Iterable[Mapping[str, Any]],
+        text_of: Callable[[Mapping[str, Any]], str] = member_profile_text,
+    ) -> dict[str, MemberScores]:
+        """Classify every member once, collecting scores per schema."""
+        results = [MemberScores() for _ in self.schemas]
+        columns = [(r.user_ids, r.scores) for r in results]
+        classify = self.classify
+        miss = self._miss
+        for member in members:
+            hits = classify(text_of(member))
+            if hits is miss:
+                continue
+            uid = member.get("user_id")
+            if not isinstance(uid, int):
+                uid = 0
+            for (user_ids, scores), score in zip(columns, hits):
+                if score is not None:
+                    user_ids.append(uid)
+                    scores.append(score)
+        return dict(zip(self.names, results))
+
+    def _classify(self, text: str) -> tuple[int | None, ...]:
+        # Same normalisation as `parse_member_card`: surrounding blanks are
+        # ignored and a card must carry a name after the score.
+        text = text.strip()
+        if not text:
+            return self._miss
+        hits: list[int | None] | None = None
+        for i, schema in enumerate(self.schemas):
+            match = schema.pattern.match(text)
+            if match is None:
+                continue
+            if "name" in schema.pattern.groupindex and not (match.group("name") or "").strip():
+                continue
+            score = int(match.group("score"))
+            if schema.min_score <= score <= schema.max_score:
+                if hits is None:
+                    hits = [None] * len(self.schemas)
+                hits[i] = score
+        return self._miss if hits is None else tuple(hits)
+
+
+def build_classifier(extra_schemas: Mapping[str, str] | None = None) -> ProfileClassifier:
+    """Built-in schemas plus configured `{name: regex}` ones."""
+    if not extra_schemas:
+        return default_classifier
+    schemas = list(BUILTIN_SCHEMAS)
+    for name, pattern in extra_schemas.items():
+        schemas.append(ProfileSchema(name, re.compile(pattern)))
+    return ProfileClassifier(schemas)
+
+
+default_classifier = ProfileClassifier()
+
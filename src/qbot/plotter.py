@@ -1,30 +1,166 @@
 from __future__ import annotations
 
+import io
+import math
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
 from datetime import UTC, datetime
-from pathlib import Path
+from functools import cache, lru_cache, partial
+from types import ModuleType
+from typing import TYPE_CHECKING, TypeVar
 from zoneinfo import ZoneInfo
 
-import matplotlib
+from qbot.bucketizer import ScoreDistribution
 
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
-from matplotlib.ticker import MaxNLocator
-
-from qbot.models import BucketCount
+if TYPE_CHECKING:
+    from PIL import Image, ImageFont
+    from matplotlib.axes import Axes
+    from matplotlib.figure import Figure
+    from matplotlib.text import Text
 
 DONUT_TEMPERATURE = 1.8
 BEIJING_TZ = ZoneInfo("Asia/Shanghai")
+# Each cached template keeps a full-size figure and its Agg canvas alive.
+TEMPLATE_CACHE_SIZE = 4
+
+F = TypeVar("F", bound="_FigureTemplate")
+
+
+@cache
+def _pyplot() -> ModuleType:
+    # matplotlib is imported on first render, not when the bot loads this module.
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+@cache
+def _register_font(font_path: str) -> str:
+    """Add the font file to matplotlib once per process and return its family name."""
+    from matplotlib import font_manager
+
+    font_manager.fontManager.addfont(font_path)
+    return font_manager.FontProperties(fname=font_path).get_name()
 
 
 def _apply_font(font_path: str | None) -> None:
+    plt = _pyplot()
     if font_path:
-        font_manager.fontManager.addfont(font_path)
-        name = font_manager.FontProperties(fname=font_path).get_name()
-        plt.rcParams["font.sans-serif"] = [name]
+        plt.rcParams["font.sans-serif"] = [_register_font(font_path)]
     plt.rcParams["axes.unicode_minus"] = False
 
 
+def preload(font_path: str | None) -> None:
+    """Import matplotlib and register the font without drawing anything."""
+    _apply_font(font_path)
+
+
+def warm_up(font_path: str | None) -> None:
+    """Load fonts and draw one throwaway figure so the first real render is fast."""
+    _apply_font(font_path)
+    plt = _pyplot()
+    fig, ax = _pyplot().subplots(figsize=(1, 1))
+    ax.set_title("预热 0123456789")
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+IMAGE_FORMATS = ("png8", "png", "webp", "jpeg")
+
+
+@dataclass(frozen=True, slots=True)
+class ImageBudget:
+    """Byte target for an encoded chart.
+
+    Each DPI is tried in order, and at each DPI each format in order. The
+    first encoding within `max_bytes` wins; if none fits, the smallest one is
+    used. `png8` is a 256-colour palette PNG, which keeps chart text sharp at
+    about a third of the RGBA PNG size. `webp` is skipped when Pillow lacks it.
+    """
+
+    max_bytes: int = 200_000
+    formats: tuple[str, ...] = ("png8", "webp", "jpeg")
+    dpis: tuple[int, ...] = (150, 120, 100)
+    quality: int = 85
+
+    def __post_init__(self) -> None:
+        unknown = set(self.formats) - set(IMAGE_FORMATS)
+        if unknown:
+            raise ValueError(f"unknown image formats: {sorted(unknown)}")
+        if not self.formats or not self.dpis:
+            raise ValueError("ImageBudget needs at least one format and one dpi")
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedImage:
+    data: bytes
+    format: str
+    dpi: int
+
+    def describe(self) -> str:
+        return f"{self.format}@{self.dpi}dpi {len(self.data) // 1024}KiB"
+
+
+def _encode_within(
+    rasterize: Callable[[int], Image.Image], budget: ImageBudget
+) -> EncodedImage:
+    smallest: EncodedImage | None = None
+    for dpi in budget.dpis:
+        raster = rasterize(dpi)
+        for fmt in _usable_formats(budget):
+            encoded = EncodedImage(_encode_raster(raster, fmt, budget.quality), fmt, dpi)
+            if len(encoded.data) <= budget.max_bytes:
+                return encoded
+            if smallest is None or len(encoded.data) < len(smallest.data):
+                smallest = encoded
+    assert smallest is not None
+    return smallest
+
+
+def _usable_formats(budget: ImageBudget) -> list[str]:
+    from PIL import features
+
+    return [f for f in budget.formats if f != "webp" or features.check("webp")]
+
+
+def _rasterize(fig: Figure, dpi: int) -> Image.Image:
+    from PIL import Image
+
+    original = fig.dpi
+    fig.set_dpi(dpi)
+    try:
+        fig.canvas.draw()
+        width, height = fig.canvas.get_width_height(physical=True)
+        rgba = fig.canvas.buffer_rgba()
+        # The charts are opaque; drop alpha so every encoder gets RGB.
+        return Image.frombuffer("RGBA", (width, height), rgba, "raw", "RGBA", 0, 1).convert("RGB")
+    finally:
+        fig.set_dpi(original)
+
+
+def _encode_raster(raster: Image.Image, fmt: str, quality: int) -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    if raster.mode == "P" and fmt != "png8":
+        raster = raster.convert("RGB")
+    if fmt == "png8":
+        if raster.mode != "P":
+            raster = raster.quantize(256, method=Image.Quantize.FASTOCTREE)
+        raster.save(buffer, "PNG")
+    elif fmt == "png":
+        raster.save(buffer, "PNG")
+    elif fmt == "webp":
+        raster.save(buffer, "WEBP", quality=quality)
+    else:
+        raster.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
 def _to_beijing(dt: datetime) -> datetime:
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=UTC)
@@ -48,304 +184,535 @@ def _temperature_scaled_weights(values: list[int], temperature: float) -> list[f
     return [x / scaled_sum for x in scaled]
 
 
+def _panel_series(
+    distribution: ScoreDistribution,
+) -> tuple[list[str], list[int], list[int], list[str], list[int], list[float]]:
+    """5-point bars with >= cumulative counts and 10-point donut slices, trimmed
+    to the bin holding the highest score."""
+    upper = distribution.upper_bound or 0
+    bins_5 = distribution.occupied(5)
+    starts_5 = bins_5.starts.tolist()
+    labels = [f"{start}-{min(start + 4, upper)}" for start in starts_5]
+    bins_10 = distribution.occupied(10)
+    labels_10 = [f"{start}-{start + 9}" for start in bins_10.starts.tolist()]
+    values_10 = bins_10.counts.tolist()
+    total = distribution.total
+    pct_10 = [v / total * 100 if total > 0 else 0.0 for v in values_10]
+    return labels, bins_5.counts.tolist(), bins_5.at_least.tolist(), labels_10, values_10, pct_10
+
+
+def _donut_colors(needed: int) -> list[tuple[float, float, float, float]]:
+    plt = _pyplot()
+    color_maps = ["tab20", "Set3", "Paired"]
+    colors: list[tuple[float, float, float, float]] = []
+    for cmap_name in color_maps:
+        cmap = plt.get_cmap(cmap_name)
+        colors.extend([cmap(i) for i in range(cmap.N)])
+        if len(colors) >= needed:
+            break
+    if len(colors) < needed:
+        fallback = plt.get_cmap("hsv")
+        colors.extend(fallback(i / needed) for i in range(needed - len(colors)))
+    return colors[:needed]
+
+
+def _place_pie_text(text: Text, theta1: float, theta2: float, distance: float, outer: bool) -> None:
+    # Same placement as Axes.pie for a unit-radius pie centred at the origin.
+    thetam = 2 * math.pi * 0.5 * (theta1 + theta2) / 360
+    xt = distance * math.cos(thetam)
+    text.set_position((xt, distance * math.sin(thetam)))
+    if outer:
+        text.set_horizontalalignment("left" if xt > 0 else "right")
+
+
+class _DistributionPanels:
+    """The 5-point bar/cumulative panel and the 10-point donut, built once per
+    bin count and updated in place."""
+
+    def __init__(
+        self,
+        ax_left: Axes,
+        ax_right: Axes,
+        n_bins: int,
+        n_slices: int,
+        tick_params: dict[str, int],
+    ) -> None:
+        positions = list(range(n_bins))
+        self.ax_left = ax_left
+        self.bars = ax_left.bar(positions, [0] * n_bins, color="#2979FF", alpha=0.9)
+        ax_left.set_title("5 分档：人数 + 累计排名")
+        ax_left.set_ylabel("人数")
+        self.bar_texts = [
+            ax_left.text(i, 0.2, "", ha="center", va="bottom", fontsize=8) for i in positions
+        ]
+        self.ax_cum = ax_left.twinx()
+        (self.cum_line,) = self.ax_cum.plot(
+            positions, [0] * n_bins, color="#D32F2F", marker="o", linewidth=1.5
+        )
+        self.ax_cum.set_ylabel("累计排名 (≥该档)")
+        self.cum_texts = [
+            self.ax_cum.text(i, 2, "", color="#B71C1C", ha="center", fontsize=7) for i in positions
+        ]
+        if positions:
+            ax_left.set_xticks(positions)
+        ax_left.tick_params(axis="x", **tick_params)
+        ax_left.set_xlabel("分数段", fontsize=10)
+
+        self.ax_right = ax_right
+        ax_right.set_title("10 分档环形图 (温度缩放面积，原始百分比)")
+        self.wedges: list = []
+        if n_slices:
+            self.wedges, self.slice_labels, self.slice_pcts = ax_right.pie(
+                [1] * n_slices,
+                labels=[""] * n_slices,
+                autopct=lambda _pct: "",
+                startangle=90,
+                colors=_donut_colors(n_slices),
+                wedgeprops={"width": 0.42, "edgecolor": "white"},
+                labeldistance=1.08,
+                pctdistance=0.78,
+                textprops={"fontsize": 8},
+            )
+            self.center_text = ax_right.text(
+                0, 0, "", ha="center", va="center", fontsize=10, color="#1b5e20", weight="bold"
+            )
+            ax_right.set_aspect("equal")
+        else:
+            ax_right.text(0.5, 0.5, "无数据", ha="center", va="center", transform=ax_right.transAxes)
+            ax_right.axis("off")
+
+    def update(self, distribution: ScoreDistribution) -> None:
+        labels, values, cumulative_ge, labels_10, values_10, pct_10 = _panel_series(distribution)
+        for bar, text, value in zip(self.bars, self.bar_texts, values, strict=True):
+            bar.set_height(value)
+            text.set_y(value + 0.2)
+            text.set_text(str(value))
+        if labels:
+            self.ax_left.set_xticks(range(len(labels)), labels)
+        self.ax_left.set_ylim(0, max(values + [0]) + 4)
+        self.cum_line.set_ydata(cumulative_ge)
+        for text, cum in zip(self.cum_texts, cumulative_ge, strict=True):
+            text.set_y(cum + 2)
+            text.set_text(str(cum))
+        self.ax_cum.set_ylim(0, max(cumulative_ge + [0]) + 10)
+        if not self.wedges:
+            return
+
+        weights = _temperature_scaled_weights(values_10, DONUT_TEMPERATURE)
+        total_weight = sum(weights)
+        theta1 = 90 / 360
+        for i, wedge in enumerate(self.wedges):
+            theta2 = theta1 + weights[i] / total_weight
+            wedge.set_theta1(360.0 * theta1)
+            wedge.set_theta2(360.0 * theta2)
+            _place_pie_text(self.slice_labels[i], wedge.theta1, wedge.theta2, 1.08, outer=True)
+            _place_pie_text(self.slice_pcts[i], wedge.theta1, wedge.theta2, 0.78, outer=False)
+            self.slice_labels[i].set_text(f"{labels_10[i]}\nN={values_10[i]}")
+            self.slice_pcts[i].set_text(f"{pct_10[i]:.1f}%")
+            theta1 = theta2
+        self.center_text.set_text(f"总计\n{distribution.total}\nT={DONUT_TEMPERATURE:.1f}")
+
+
+class _TrendPanel:
+    def __init__(self, ax: Axes, points: list[tuple[datetime, int]]) -> None:
+        self.ax = ax
+        self.line = None
+        if points:
+            # Plot real points once so the axis picks up date units.
+            xs, ys = _trend_series(points)
+            (self.line,) = ax.plot(xs, ys, marker="o", color="#00A86B")
+        ax.set_ylabel("有效人数")
+        ax.set_xlabel("时间")
+        from matplotlib.ticker import MaxNLocator
+
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+    def update(self, points: list[tuple[datetime, int]], title: str) -> None:
+        if self.line is not None:
+            self.line.set_data(*_trend_series(points))
+            self.ax.relim()
+            self.ax.autoscale_view()
+        self.ax.set_title(title)
+
+
+def _trend_series(points: list[tuple[datetime, int]]) -> tuple[list[datetime], list[int]]:
+    return [_to_beijing(p[0]) for p in points], [p[1] for p in points]
+
+
+_LAYOUT_KEYS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+
+class _FigureTemplate:
+    """A figure kept across renders. tight_layout starts from the current
+    subplot positions, so they are put back before every render to lay out
+    the same way a freshly built figure would."""
+
+    def __init__(self, fig: Figure) -> None:
+        self.fig = fig
+        self._figure_layout = {k: getattr(fig.subplotpars, k) for k in _LAYOUT_KEYS}
+        self._grid_layouts = [
+            (gs, {k: getattr(gs, k) for k in _LAYOUT_KEYS})
+            for gs in {id(ax.get_gridspec()): ax.get_gridspec() for ax in fig.axes}.values()
+        ]
+
+    def reset_layout(self) -> None:
+        self.fig.subplots_adjust(**self._figure_layout)
+        for gs, layout in self._grid_layouts:
+            gs.update(**layout)
+
+    def tight_layout(self, **kwargs) -> None:
+        self.fig.tight_layout(**kwargs)
+        # tight_layout leaves a placeholder layout engine behind, which makes
+        # savefig run an extra dry-run draw; the positions are already final.
+        self.fig.set_layout_engine(None)
+
+    def encode(self, budget: ImageBudget | None = None) -> EncodedImage:
+        """Encode in memory; nothing touches disk. Without a budget this is a
+        plain 150-dpi PNG."""
+        if budget is None:
+            buffer = io.BytesIO()
+            self.fig.savefig(buffer, format="png", dpi=150)
+            return EncodedImage(buffer.getvalue(), "png", 150)
+        return _encode_within(partial(_rasterize, self.fig), budget)
+
+
+class _BucketTemplate(_FigureTemplate):
+    def __init__(self, n_bins: int, n_slices: int) -> None:
+        fig, (ax_left, ax_right) = _pyplot().subplots(1, 2, figsize=(18, 6))
+        self.title = fig.suptitle("", fontsize=14)
+        fig.subplots_adjust(wspace=0.25)
+        self.panels = _DistributionPanels(
+            ax_left, ax_right, n_bins, n_slices, {"rotation": 45, "pad": 8}
+        )
+        super().__init__(fig)
+
+
+class _TrendTemplate(_FigureTemplate):
+    def __init__(self, points: list[tuple[datetime, int]]) -> None:
+        fig, ax = _pyplot().subplots(figsize=(12, 5))
+        self.trend = _TrendPanel(ax, points)
+        super().__init__(fig)
+
+
+class _DashboardTemplate(_FigureTemplate):
+    def __init__(self, n_bins: int, n_slices: int, points: list[tuple[datetime, int]]) -> None:
+        fig = _pyplot().figure(figsize=(18, 11.5))
+        gs = fig.add_gridspec(2, 2, height_ratios=[2.0, 1.1], hspace=0.55, wspace=0.25)
+        ax_left = fig.add_subplot(gs[0, 0])
+        ax_right = fig.add_subplot(gs[0, 1])
+        ax_bottom = fig.add_subplot(gs[1, :])
+        self.title = fig.suptitle("", fontsize=14)
+        self.panels = _DistributionPanels(
+            ax_left, ax_right, n_bins, n_slices, {"rotation": 35, "pad": 10, "labelsize": 9}
+        )
+        self.trend = _TrendPanel(ax_bottom, points)
+        ax_bottom.tick_params(axis="x", pad=8)
+        super().__init__(fig)
+
+
+_templates: OrderedDict[Hashable, _FigureTemplate] = OrderedDict()
+
+
+def _template(key: Hashable, build: Callable[[], F]) -> F:
+    """Reuse the figure built for this layout, building it on first use.
+
+    Templates are per process and not thread-safe; render calls run one at a
+    time in each render worker (or on the event loop when rendering inline).
+    """
+    template = _templates.pop(key, None)
+    if template is None:
+        template = build()
+        while len(_templates) >= TEMPLATE_CACHE_SIZE:
+            _, evicted = _templates.popitem(last=False)
+            _pyplot().close(evicted.fig)
+    _templates[key] = template
+    return template
+
+
+def clear_templates() -> None:
+    while _templates:
+        _, template = _templates.popitem()
+        _pyplot().close(template.fig)
+
+
+def _layout(distribution: ScoreDistribution) -> tuple[int, int]:
+    return len(distribution.occupied(5)), len(distribution.occupied(10))
+
+
 def render_bucket_chart(
-    output_path: Path,
-    buckets: list[BucketCount],
+    distribution: ScoreDistribution,
     group_id: int,
     collected_at: datetime,
     font_path: str | None,
-) -> Path:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    budget: ImageBudget | None = None,
+) -> EncodedImage:
     _apply_font(font_path)
 
-    # Visualization-only trim: drop trailing empty bins above current max score.
-    plot_buckets = list(buckets)
-    while plot_buckets and plot_buckets[-1].count == 0:
-        plot_buckets.pop()
-    if not plot_buckets:
-        plot_buckets = list(buckets)
-
-    labels = [f"{b.start}-{b.end}" for b in plot_buckets]
-    values = [b.count for b in plot_buckets]
-    total = sum(values)
-
-    # Cumulative rank for 5-point bins (>= current bin).
-    cumulative_ge: list[int] = []
-    running = 0
-    for v in reversed(values):
-        running += v
-        cumulative_ge.append(running)
-    cumulative_ge.reverse()
-
-    # Aggregate into 10-point bins: 350-359, 360-369, ...
-    agg_10: dict[int, int] = {}
-    for b in plot_buckets:
-        start_10 = (b.start // 10) * 10
-        agg_10[start_10] = agg_10.get(start_10, 0) + b.count
-    labels_10 = [f"{start}-{start + 9}" for start in sorted(agg_10)]
-    values_10 = [agg_10[start] for start in sorted(agg_10)]
-    pct_10 = [v / total * 100 if total > 0 else 0.0 for v in values_10]
-
+    n_bins, n_slices = _layout(distribution)
+    template = _template(
+        ("bucket", font_path, n_bins, n_slices), lambda: _BucketTemplate(n_bins, n_slices)
+    )
     collected_at_bj = _to_beijing(collected_at)
-    fig, (ax_left, ax_right) = plt.subplots(1, 2, figsize=(18, 6))
-    fig.suptitle(
-        f"群 {group_id} 分数分布 ({collected_at_bj.strftime('%Y-%m-%d %H:%M')} 北京时间)",
-        fontsize=14,
+    template.title.set_text(
+        f"群 {group_id} 分数分布 ({collected_at_bj.strftime('%Y-%m-%d %H:%M')} 北京时间)"
     )
-    fig.subplots_adjust(wspace=0.25)
-
-    bars = ax_left.bar(labels, values, color="#2979FF", alpha=0.9)
-    ax_left.set_title("5 分档：人数 + 累计排名")
-    ax_left.set_xlabel("分数段")
-    ax_left.set_ylabel("人数")
-    ax_left.set_ylim(0, max(values + [0]) + 4)
-    for bar, value in zip(bars, values, strict=False):
-        ax_left.text(
-            bar.get_x() + bar.get_width() / 2,
-            bar.get_height() + 0.2,
-            str(value),
-            ha="center",
-            va="bottom",
-            fontsize=8,
-        )
+    template.panels.update(distribution)
 
-    ax_cum = ax_left.twinx()
-    ax_cum.plot(labels, cumulative_ge, color="#D32F2F", marker="o", linewidth=1.5)
-    ax_cum.set_ylabel("累计排名 (≥该档)")
-    ax_cum.set_ylim(0, max(cumulative_ge + [0]) + 10)
-    for i, cum in enumerate(cumulative_ge):
-        ax_cum.text(i, cum + 2, str(cum), color="#B71C1C", ha="center", fontsize=7)
-    ax_left.tick_params(axis="x", rotation=45, pad=8)
-    ax_left.set_xlabel("分数段", fontsize=10)
-
-    ax_right.set_title("10 分档环形图 (温度缩放面积，原始百分比)")
-    if total > 0 and any(values_10):
-        color_maps = ["tab20", "Set3", "Paired"]
-        colors: list[tuple[float, float, float, float]] = []
-        needed = len(values_10)
-        for cmap_name in color_maps:
-            cmap = plt.get_cmap(cmap_name)
-            colors.extend([cmap(i) for i in range(cmap.N)])
-            if len(colors) >= needed:
-                break
-        if len(colors) < needed:
-            fallback = plt.get_cmap("hsv")
-            colors.extend(fallback(i / needed) for i in range(needed - len(colors)))
-        colors = colors[:needed]
-
-        scaled_weights = _temperature_scaled_weights(values_10, DONUT_TEMPERATURE)
-
-        label_with_count = [
-            f"{label}\nN={count}"
-            for label, count in zip(labels_10, values_10, strict=False)
-        ]
-
-        pct_idx = {"i": 0}
-
-        def _autopct(_pct: float) -> str:
-            i = pct_idx["i"]
-            pct_idx["i"] += 1
-            if i >= len(pct_10):
-                return ""
-            return f"{pct_10[i]:.1f}%"
-
-        ax_right.pie(
-            scaled_weights,
-            labels=label_with_count,
-            autopct=_autopct,
-            startangle=90,
-            colors=colors,
-            wedgeprops={"width": 0.42, "edgecolor": "white"},
-            labeldistance=1.08,
-            pctdistance=0.78,
-            textprops={"fontsize": 8},
-        )
-        ax_right.text(
-            0,
-            0,
-            f"总计\n{total}\nT={DONUT_TEMPERATURE:.1f}",
-            ha="center",
-            va="center",
-            fontsize=10,
-            color="#1b5e20",
-            weight="bold",
-        )
-        ax_right.set_aspect("equal")
-    else:
-        ax_right.text(0.5, 0.5, "无数据", ha="center", va="center", transform=ax_right.transAxes)
-        ax_right.axis("off")
-
-    fig.tight_layout()
-    fig.savefig(output_path, dpi=150)
-    plt.close(fig)
-    return output_path
+    template.reset_layout()
+    template.tight_layout()
+    return template.encode(budget)
 
 
 def render_trend_chart(
-    output_path: Path,
     points: list[tuple[datetime, int]],
     group_id: int,
     window_hours: int,
     font_path: str | None,
-) -> Path:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    budget: ImageBudget | None = None,
+) -> EncodedImage:
     _apply_font(font_path)
 
-    fig, ax = plt.subplots(figsize=(12, 5))
-    if points:
-        xs = [_to_beijing(p[0]) for p in points]
-        ys = [p[1] for p in points]
-        ax.plot(xs, ys, marker="o", color="#00A86B")
-    ax.set_title(f"群 {group_id} 有效人数趋势 (最近{window_hours}小时)")
-    ax.set_xlabel("时间")
-    ax.set_ylabel("有效人数")
-    ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-    fig.autofmt_xdate()
-    fig.tight_layout()
-    fig.savefig(output_path, dpi=150)
-    plt.close(fig)
-    return output_path
+    template = _template(("trend", font_path, bool(points)), lambda: _TrendTemplate(points))
+    template.trend.update(points, f"群 {group_id} 有效人数趋势 (最近{window_hours}小时)")
+    template.reset_layout()
+    template.fig.autofmt_xdate()
+    template.tight_layout()
+    return template.encode(budget)
 
 
 def render_dashboard_chart(
-    output_path: Path,
-    buckets: list[BucketCount],
+    distribution: ScoreDistribution,
     points: list[tuple[datetime, int]],
     group_id: int,
     collected_at: datetime,
     window_hours: int,
     font_path: str | None,
-) -> Path:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    budget: ImageBudget | None = None,
+) -> EncodedImage:
     _apply_font(font_path)
 
-    plot_buckets = list(buckets)
-    while plot_buckets and plot_buckets[-1].count == 0:
-        plot_buckets.pop()
-    if not plot_buckets:
-        plot_buckets = list(buckets)
+    n_bins, n_slices = _layout(distribution)
+    template = _template(
+        ("dashboard", font_path, n_bins, n_slices, bool(points)),
+        lambda: _DashboardTemplate(n_bins, n_slices, points),
+    )
+    collected_at_bj = _to_beijing(collected_at)
+    template.title.set_text(
+        f"群 {group_id} 统计看板 ({collected_at_bj.strftime('%Y-%m-%d %H:%M')} 北京时间)"
+    )
+    template.panels.update(distribution)
+    template.trend.update(points, f"有效人数趋势 (最近{window_hours}小时)")
+    for label in template.trend.ax.get_xticklabels():
+        label.set_rotation(30)
+        label.set_ha("right")
 
-    labels = [f"{b.start}-{b.end}" for b in plot_buckets]
-    values = [b.count for b in plot_buckets]
-    total = sum(values)
+    template.reset_layout()
+    template.tight_layout(rect=[0, 0.02, 1, 0.95], h_pad=2.2)
+    return template.encode(budget)
+
+
+# Fast mode: the bars, cumulative line and trend sparkline drawn straight onto
+# a Pillow canvas. No matplotlib, no layout engine; the donut is left out.
+FAST_SIZE_INCHES = (12.0, 7.0)
+FAST_DPI = 100
+# The fast canvas is a palette image: few colours, no antialiasing, and a
+# PNG encode that is a fraction of the RGB one. Values are palette indexes.
+_FAST_PALETTE = (
+    (255, 255, 255),
+    (33, 33, 33),
+    (96, 96, 96),
+    (232, 232, 232),
+    (41, 121, 255),
+    (211, 47, 47),
+    (0, 168, 107),
+)
+_WHITE, _TEXT_COLOR, _AXIS_COLOR, _GRID_COLOR, _BAR_COLOR, _CUM_COLOR, _TREND_COLOR = range(
+    len(_FAST_PALETTE)
+)
+
+
+@cache
+def _pil_font(font_path: str | None, size: int) -> ImageFont.FreeTypeFont:
+    from PIL import ImageFont
 
-    cumulative_ge: list[int] = []
-    running = 0
-    for v in reversed(values):
-        running += v
-        cumulative_ge.append(running)
-    cumulative_ge.reverse()
-
-    agg_10: dict[int, int] = {}
-    for b in plot_buckets:
-        start_10 = (b.start // 10) * 10
-        agg_10[start_10] = agg_10.get(start_10, 0) + b.count
-    labels_10 = [f"{start}-{start + 9}" for start in sorted(agg_10)]
-    values_10 = [agg_10[start] for start in sorted(agg_10)]
-    pct_10 = [v / total * 100 if total > 0 else 0.0 for v in values_10]
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size)
 
-    collected_at_bj = _to_beijing(collected_at)
-    fig = plt.figure(figsize=(18, 11.5))
-    gs = fig.add_gridspec(2, 2, height_ratios=[2.0, 1.1], hspace=0.55, wspace=0.25)
-    ax_left = fig.add_subplot(gs[0, 0])
-    ax_right = fig.add_subplot(gs[0, 1])
-    ax_bottom = fig.add_subplot(gs[1, :])
-    fig.suptitle(
-        f"群 {group_id} 统计看板 ({collected_at_bj.strftime('%Y-%m-%d %H:%M')} 北京时间)",
-        fontsize=14,
+
+@lru_cache(maxsize=2048)
+def _text_mask(
+    font_path: str | None, size: int, text: str, anchor: str
+) -> tuple[Image.Image, tuple[int, int]]:
+    # Glyph rasterisation dominates a fast render, and the tick labels and
+    # counts repeat from one dashboard to the next.
+    from PIL import Image, ImageDraw
+
+    font = _pil_font(font_path, size)
+    left, top, right, bottom = font.getbbox(text, mode="1", anchor=anchor)
+    mask = Image.new("1", (max(1, right - left), max(1, bottom - top)))
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=1, font=font, anchor=anchor)
+    return mask, (left, top)
+
+
+class _FastCanvas:
+    """Palette image laid out in 100-dpi units and scaled to `dpi`."""
+
+    def __init__(self, dpi: int, font_path: str | None) -> None:
+        from PIL import Image, ImageDraw
+
+        self.scale = dpi / 100
+        self.font_path = font_path
+        self.width, self.height = (round(v * dpi) for v in FAST_SIZE_INCHES)
+        self.image = Image.new("P", (self.width, self.height), _WHITE)
+        self.image.putpalette([channel for color in _FAST_PALETTE for channel in color])
+        self.draw = ImageDraw.Draw(self.image)
+
+    def px(self, v: float) -> int:
+        return round(v * self.scale)
+
+    def text(
+        self, xy: tuple[float, float], text: str, size: int, anchor: str, color: int = _TEXT_COLOR
+    ) -> None:
+        mask, (dx, dy) = _text_mask(self.font_path, self.px(size), text, anchor)
+        x, y = round(xy[0]) + dx, round(xy[1]) + dy
+        self.image.paste(color, (x, y, x + mask.width, y + mask.height), mask)
+
+
+def render_fast_dashboard(
+    distribution: ScoreDistribution,
+    points: list[tuple[datetime, int]],
+    group_id: int,
+    collected_at: datetime,
+    window_hours: int,
+    font_path: str | None,
+    budget: ImageBudget | None = None,
+) -> EncodedImage:
+    """Pillow counterpart of `render_dashboard_chart`, for speed over polish."""
+    draw = partial(
+        _draw_fast_dashboard, distribution, points, group_id, collected_at, window_hours, font_path
     )
+    if budget is None:
+        return EncodedImage(_encode_raster(draw(FAST_DPI), "png8", 0), "png8", FAST_DPI)
+    return _encode_within(draw, budget)
 
-    bars = ax_left.bar(labels, values, color="#2979FF", alpha=0.9)
-    ax_left.set_title("5 分档：人数 + 累计排名")
-    ax_left.set_xlabel("分数段")
-    ax_left.set_ylabel("人数")
-    ax_left.set_ylim(0, max(values + [0]) + 4)
-    for bar, value in zip(bars, values, strict=False):
-        ax_left.text(
-            bar.get_x() + bar.get_width() / 2,
-            bar.get_height() + 0.2,
-            str(value),
-            ha="center",
-            va="bottom",
-            fontsize=8,
-        )
-    ax_cum = ax_left.twinx()
-    ax_cum.plot(labels, cumulative_ge, color="#D32F2F", marker="o", linewidth=1.5)
-    ax_cum.set_ylabel("累计排名 (≥该档)")
-    ax_cum.set_ylim(0, max(cumulative_ge + [0]) + 10)
-    for i, cum in enumerate(cumulative_ge):
-        ax_cum.text(i, cum + 2, str(cum), color="#B71C1C", ha="center", fontsize=7)
-    ax_left.tick_params(axis="x", rotation=35, pad=10, labelsize=9)
-    ax_left.set_xlabel("分数段", fontsize=10)
-
-    ax_right.set_title("10 分档环形图 (温度缩放面积，原始百分比)")
-    if total > 0 and any(values_10):
-        color_maps = ["tab20", "Set3", "Paired"]
-        colors: list[tuple[float, float, float, float]] = []
-        needed = len(values_10)
-        for cmap_name in color_maps:
-            cmap = plt.get_cmap(cmap_name)
-            colors.extend([cmap(i) for i in range(cmap.N)])
-            if len(colors) >= needed:
-                break
-        if len(colors) < needed:
-            fallback = plt.get_cmap("hsv")
-            colors.extend(fallback(i / needed) for i in range(needed - len(colors)))
-        colors = colors[:needed]
-        scaled_weights = _temperature_scaled_weights(values_10, DONUT_TEMPERATURE)
-        label_with_count = [
-            f"{label}\nN={count}"
-            for label, count in zip(labels_10, values_10, strict=False)
-        ]
-        pct_idx = {"i": 0}
-
-        def _autopct(_pct: float) -> str:
-            i = pct_idx["i"]
-            pct_idx["i"] += 1
-            if i >= len(pct_10):
-                return ""
-            return f"{pct_10[i]:.1f}%"
-
-        ax_right.pie(
-            scaled_weights,
-            labels=label_with_count,
-            autopct=_autopct,
-            startangle=90,
-            colors=colors,
-            wedgeprops={"width": 0.42, "edgecolor": "white"},
-            labeldistance=1.08,
-            pctdistance=0.78,
-            textprops={"fontsize": 8},
-        )
-        ax_right.text(
-            0,
-            0,
-            f"总计\n{total}\nT={DONUT_TEMPERATURE:.1f}",
-            ha="center",
-            va="center",
-            fontsize=10,
-            color="#1b5e20",
-            weight="bold",
-        )
-        ax_right.set_aspect("equal")
-    else:
-        ax_right.text(0.5, 0.5, "无数据", ha="center", va="center", transform=ax_right.transAxes)
-        ax_right.axis("off")
-
-    if points:
-        xs = [_to_beijing(p[0]) for p in points]
-        ys = [p[1] for p in points]
-        ax_bottom.plot(xs, ys, marker="o", color="#00A86B")
-    ax_bottom.set_title(f"有效人数趋势 (最近{window_hours}小时)")
-    ax_bottom.set_xlabel("时间")
-    ax_bottom.set_ylabel("有效人数")
-    ax_bottom.yaxis.set_major_locator(MaxNLocator(integer=True))
-    for label in ax_bottom.get_xticklabels():
-        label.set_rotation(30)
-        label.set_ha("right")
-    ax_bottom.tick_params(axis="x", pad=8)
 
-    fig.tight_layout(rect=[0, 0.02, 1, 0.95], h_pad=2.2)
-    fig.savefig(output_path, dpi=150)
-    plt.close(fig)
-    return output_path
+def _draw_fast_dashboard(
+    distribution: ScoreDistribution,
+    points: list[tuple[datetime, int]],
+    group_id: int,
+    collected_at: datetime,
+    window_hours: int,
+    font_path: str | None,
+    dpi: int,
+) -> Image.Image:
+    canvas = _FastCanvas(dpi, font_path)
+    px = canvas.px
+    collected_at_bj = _to_beijing(collected_at)
+    canvas.text(
+        (canvas.width // 2, px(14)),
+        f"群 {group_id} 统计看板 ({collected_at_bj.strftime('%Y-%m-%d %H:%M')} 北京时间)"
+        f"  有效人数 {distribution.total}",
+        18,
+        "mt",
+    )
+    labels, values, cumulative_ge, _, _, _ = _panel_series(distribution)
+    _draw_fast_bars(
+        canvas, (px(70), px(70), canvas.width - px(70), px(430)), labels, values, cumulative_ge
+    )
+    _draw_fast_trend(
+        canvas,
+        (px(70), px(500), canvas.width - px(70), px(660)),
+        points,
+        f"有效人数趋势 (最近{window_hours}小时)",
+    )
+    return canvas.image
+
+
+def _draw_fast_bars(
+    canvas: _FastCanvas,
+    box: tuple[int, int, int, int],
+    labels: list[str],
+    values: list[int],
+    cumulative_ge: list[int],
+) -> None:
+    draw, px = canvas.draw, canvas.px
+    left, top, right, bottom = box
+    canvas.text((left, top - px(6)), "5 分档：人数 + 累计排名", 13, "lb")
+    draw.line((left, bottom, right, bottom), fill=_AXIS_COLOR, width=max(1, px(1)))
+    draw.line((left, top, left, bottom), fill=_AXIS_COLOR, width=max(1, px(1)))
+    if not values:
+        canvas.text(((left + right) / 2, (top + bottom) / 2), "无数据", 16, "mm")
+        return
+
+    plot_top = top + px(22)
+    span = bottom - plot_top
+    max_value = max(values) or 1
+    max_cum = max(cumulative_ge) or 1
+    slot = (right - left) / len(values)
+    bar_width = max(1, round(slot * 0.8))
+    cum_points = []
+    for i, (label, value, cum) in enumerate(zip(labels, values, cumulative_ge, strict=True)):
+        center = left + slot * (i + 0.5)
+        bar_top = bottom - round(span * value / max_value)
+        if value:
+            draw.rectangle(
+                (round(center - bar_width / 2), bar_top, round(center + bar_width / 2), bottom),
+                fill=_BAR_COLOR,
+            )
+        canvas.text((center, bar_top - px(2)), str(value), 9, "mb")
+        canvas.text((center, bottom + px(4)), label.split("-")[0], 9, "mt")
+        cum_points.append((center, bottom - round(span * cum / max_cum), cum))
+
+    draw.line([(x, y) for x, y, _ in cum_points], fill=_CUM_COLOR, width=max(1, px(2)))
+    radius = px(3)
+    for x, y, cum in cum_points:
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=_CUM_COLOR)
+        canvas.text((x, y - radius - px(1)), str(cum), 8, "mb", _CUM_COLOR)
+
+
+def _draw_fast_trend(
+    canvas: _FastCanvas,
+    box: tuple[int, int, int, int],
+    points: list[tuple[datetime, int]],
+    title: str,
+) -> None:
+    draw, px = canvas.draw, canvas.px
+    left, top, right, bottom = box
+    canvas.text((left, top - px(6)), title, 13, "lb")
+    draw.rectangle(box, outline=_AXIS_COLOR, width=max(1, px(1)))
+    if not points:
+        canvas.text(((left + right) / 2, (top + bottom) / 2), "无数据", 14, "mm")
+        return
+
+    xs = [p[0].timestamp() for p in points]
+    ys = [p[1] for p in points]
+    x_min, x_max = min(xs), max(xs)
+    y_min, y_max = min(ys), max(ys)
+    inner = (left + px(10), top + px(14), right - px(10), bottom - px(14))
+    x_span = (x_max - x_min) or 1
+    y_span = (y_max - y_min) or 1
+    mid = (inner[1] + inner[3]) / 2
+    line = [
+        (
+            inner[0] + (inner[2] - inner[0]) * (x - x_min) / x_span,
+            mid if y_max == y_min else inner[3] - (inner[3] - inner[1]) * (y - y_min) / y_span,
+        )
+        for x, y in zip(xs, ys, strict=True)
+    ]
+    for y_value, y_pos in ((y_max, inner[1]), (y_min, inner[3])):
+        draw.line((left, y_pos, right, y_pos), fill=_GRID_COLOR, width=1)
+        canvas.text((left - px(4), y_pos), str(y_value), 10, "rm")
+    if len(line) > 1:
+        draw.line(line, fill=_TREND_COLOR, width=max(1, px(2)))
+    radius = px(2)
+    for x, y in line:
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=_TREND_COLOR)
+    for dt, x, anchor in ((points[0][0], left, "lt"), (points[-1][0], right, "rt")):
+        canvas.text((x, bottom + px(4)), _to_beijing(dt).strftime("%m-%d %H:%M"), 10, anchor)
+
+
+RENDERERS: dict[str, Callable[..., EncodedImage]] = {
+    "matplotlib": render_dashboard_chart,
+    "pillow": render_fast_dashboard,
+}
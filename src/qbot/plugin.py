@@ -1,31 +1,41 @@
 from __future__ import annotations
 
 import asyncio
-import base64
+from collections.abc import Mapping, Sequence
 from pathlib import Path
 import re
 from time import monotonic
 import unicodedata
 from zoneinfo import ZoneInfo
 
-from nonebot import get_driver, logger, on, on_message
-from nonebot.adapters.onebot.v11 import Bot, Event, GroupMessageEvent, MessageSegment
+from nonebot import get_driver, logger, on, on_message, on_notice
+from nonebot.adapters.onebot.v11 import (
+    Bot,
+    Event,
+    GroupMessageEvent,
+    MessageSegment,
+    NoticeEvent,
+)
 from nonebot.exception import ActionFailed
 from nonebot.plugin import require
 
+from qbot import plotter
+from qbot.chartcache import ChartCache
 from qbot.config import settings
-from qbot.collector import get_group_members
-from qbot.ranker import rank_and_percentile
+from qbot.parser import ZHEJI, ZHERUAN, build_classifier
+from qbot.collector import MemberListCache, MemberSource
+from qbot.renderpool import MANUAL_PRIORITY, SCHEDULED_PRIORITY, RenderPool
 from qbot.repository import ScoreRepository
+from qbot.roster import MEMBER_NOTICE_TYPES, LiveRoster
 from qbot.service import ScoreStatService
+from qbot.sharding import fetch_memberships, run_sharded
+from qbot.usage import CommandUsageSink
 from qbot.setops import (
     build_overlap_text,
     collect_candidates,
     is_zheji_candidate,
     is_zheruan_candidate,
     member_profile_text,
-    parse_zheji_score,
-    parse_zheruan_score,
 )
 
 require("nonebot_plugin_apscheduler")
@@ -33,15 +43,53 @@ from nonebot_plugin_apscheduler import scheduler
 
 
 driver = get_driver()
-repo = ScoreRepository(settings.db_path)
+repo = ScoreRepository(settings.db_path, reader_pool_size=settings.db_reader_pool_size)
+member_cache = MemberListCache(
+    ttl_seconds=settings.member_cache_ttl_seconds,
+    timeout_seconds=settings.member_fetch_timeout_seconds,
+)
+roster = (
+    LiveRoster(fetch_timeout_seconds=settings.member_fetch_timeout_seconds)
+    if settings.live_roster
+    else None
+)
+members: MemberSource = roster if roster is not None else member_cache
+classifier = build_classifier(settings.profile_schemas)
+render_pool = (
+    RenderPool(
+        workers=settings.render_workers,
+        font_path=settings.font_path,
+        max_pending=settings.render_queue_size,
+    )
+    if settings.render_workers > 0
+    else None
+)
 service = ScoreStatService(
     repository=repo,
     history_window_hours=settings.history_window_hours,
     retention_days=settings.retention_days,
     font_path=settings.font_path,
+    members=members,
+    classifier=classifier,
+    cutoff_policy=settings.cutoffs,
+    group_cutoff_policies=settings.group_cutoffs,
+    render_pool=render_pool,
+    chart_cache=ChartCache(
+        Path("data/charts/cache") if settings.chart_archive_mb > 0 else None,
+        max_bytes=settings.chart_cache_mb * 1024 * 1024,
+        max_disk_bytes=settings.chart_archive_mb * 1024 * 1024,
+    ),
+    image_budget=settings.image_budget,
+    renderer=settings.renderer,
+)
+usage_sink = CommandUsageSink(
+    repo,
+    batch_size=settings.usage_batch_size,
+    flush_interval_seconds=settings.usage_flush_interval_seconds,
 )
 
 _locks: dict[int, asyncio.Lock] = {}
+_warm_up_task: asyncio.Task[None] | None = None
 _last_manual_trigger_at: dict[int, float] = {}
 MANUAL_TRIGGER_COOLDOWN_SECONDS = 8.0
 BEIJING_TZ = ZoneInfo("Asia/Shanghai")
@@ -53,12 +101,6 @@ def _get_lock(group_id: int) -> asyncio.Lock:
     return _locks[group_id]
 
 
-def _image_segment_from_file(path: Path) -> MessageSegment:
-    raw = path.read_bytes()
-    b64 = base64.b64encode(raw).decode("ascii")
-    return MessageSegment.image(f"base64://{b64}")
-
-
 def _is_group_allowed(group_id: int) -> bool:
     return str(group_id) in set(settings.enabled_groups)
 
@@ -69,14 +111,22 @@ def _normalize_usage_command(command: str) -> str:
     return command
 
 
-async def _send_stat(bot: Bot, group_id: int) -> bool:
+async def _send_scheduled_stat(bot: Bot, group_id: int) -> bool:
+    return await _send_stat(bot, group_id, scheduled=True)
+
+
+async def _send_stat(bot: Bot, group_id: int, scheduled: bool = False) -> bool:
     lock = _get_lock(group_id)
     async with lock:
         logger.info("Start scorestat for group {}", group_id)
         result = None
         for attempt in range(3):
             try:
-                result = await service.run_once(bot, group_id)
+                result = await service.run_once(
+                    bot,
+                    group_id,
+                    priority=SCHEDULED_PRIORITY if scheduled else MANUAL_PRIORITY,
+                )
                 break
             except Exception:
                 logger.exception(
@@ -89,26 +139,33 @@ async def _send_stat(bot: Bot, group_id: int) -> bool:
             logger.error("Group {} stat failed after retries", group_id)
             return False
 
+        send_images = True
+        if scheduled and not result.changed:
+            if settings.unchanged_report == "skip":
+                logger.info("Group {} distribution unchanged, report skipped", group_id)
+                return True
+            send_images = settings.unchanged_report == "send"
+
         try:
             await bot.send_group_msg(group_id=group_id, message=result.summary_text)
         except ActionFailed as exc:
             logger.warning("Group {} summary send failed: {}", group_id, exc)
             return False
 
-        if result.bucket_image:
+        if send_images and result.bucket_image:
             try:
                 await bot.send_group_msg(
                     group_id=group_id,
-                    message=_image_segment_from_file(result.bucket_image.resolve()),
+                    message=MessageSegment.image(result.bucket_image),
                 )
             except ActionFailed as exc:
                 logger.warning("Group {} bucket image send failed: {}", group_id, exc)
 
-        if result.trend_image:
+        if send_images and result.trend_image:
             try:
                 await bot.send_group_msg(
                     group_id=group_id,
-                    message=_image_segment_from_file(result.trend_image.resolve()),
+                    message=MessageSegment.image(result.trend_image),
                 )
             except ActionFailed as exc:
                 logger.warning("Group {} trend image send failed: {}", group_id, exc)
@@ -118,6 +175,7 @@ async def _send_stat(bot: Bot, group_id: int) -> bool:
 
 scorestat_msg = on_message(priority=10, block=True)
 scorestat_sent_msg = on("message_sent", priority=10, block=False)
+member_notice = on_notice(priority=10, block=False)
 
 STAT_HELP_TEXT = (
     "规则：\n"
@@ -128,8 +186,9 @@ STAT_HELP_TEXT = (
 )
 
 RANK_HELP_TEXT = (
-    "用法：`/rank` 或 `/rank win`\n"
-    "功能：`/rank` 查询你自己的排名、百分位、是否在复试线上；`/rank win` 额外显示 202 线/202均分机考追分分析。\n"
+    "用法：`/rank`、`/rank win` 或 `/rank all`\n"
+    "功能：`/rank` 查询你自己的排名、百分位、是否在复试线上；`/rank win` 额外显示 202 线/202均分机考追分分析；"
+    "`/rank all` 以合并转发发送全群排名。\n"
     "前提：你的名片/昵称必须是 `分数-名字` 或 `分数—名字`，且分数在 350-500。"
 )
 
@@ -157,6 +216,7 @@ ALL_HELP_TEXT = (
     "`/stat help`：查看统计规则\n"
     "`/rank`：查询你在浙软群的排名\n"
     "`/rank win`：在个人排名后附加机考追分分析\n"
+    "`/rank all`：查看全群排名\n"
     "`/rank help`：查看个人排名规则\n"
     "`/rank-comp`：查询跨群排名对比\n"
     "`/rank-comp help`：查看跨群排名规则\n"
@@ -168,6 +228,9 @@ ALL_HELP_TEXT = (
 @driver.on_startup
 async def _on_startup() -> None:
     await repo.init()
+    usage_sink.start()
+    if render_pool is not None:
+        render_pool.start()
     logger.info("qbot repository initialized at {}", settings.db_path)
     logger.info("qbot enabled groups: {}", settings.enabled_groups)
 
@@ -181,18 +244,113 @@ async def _on_startup() -> None:
     async def _scheduled_stat() -> None:
         if not settings.enabled_groups:
             return
-        bots = list(get_driver().bots.values())
+        bots = dict(get_driver().bots)
         if not bots:
             logger.warning("No active bot found for scheduled scorestat")
             return
-        bot = bots[0]
+        group_ids: list[int] = []
         for group_id_raw in settings.enabled_groups:
             try:
-                group_id = int(group_id_raw)
+                group_ids.append(int(group_id_raw))
             except ValueError:
                 logger.warning("Skip invalid group id in QBOT_ENABLED_GROUPS: {}", group_id_raw)
-                continue
-            await _send_stat(bot, group_id)
+
+        memberships = await fetch_memberships(bots, settings.member_fetch_timeout_seconds)
+        results = await run_sharded(
+            group_ids,
+            bots,
+            memberships,
+            _send_scheduled_stat,
+            concurrency_per_bot=settings.bot_concurrency,
+            is_connected=lambda bot_id: bot_id in get_driver().bots,
+        )
+        failed = [group_id for group_id, ok in results.items() if not ok]
+        if failed:
+            logger.error("Scheduled scorestat failed for groups {}", failed)
+
+    if roster is not None:
+
+        @scheduler.scheduled_job(
+            "interval",
+            minutes=settings.roster_resync_minutes,
+            id="qbot_roster_resync",
+        )
+        async def _scheduled_roster_resync() -> None:
+            bots = dict(get_driver().bots)
+            if not bots:
+                return
+            failed = await _resync_rosters(roster, bots)
+            if failed:
+                logger.error("Roster resync failed for groups {}", failed)
+
+    @scheduler.scheduled_job(
+        "cron",
+        minute="30",
+        hour="4",
+        timezone=BEIJING_TZ,
+        id="qbot_retention",
+    )
+    async def _scheduled_retention() -> None:
+        try:
+            removed = await service.cleanup()
+        except Exception:
+            logger.exception("Scheduled retention cleanup failed")
+            return
+        logger.info("Retention cleanup removed {} snapshots", removed)
+
+
+async def _resync_rosters(live_roster: LiveRoster, bots: Mapping[str, Bot]) -> list[int]:
+    """Resync every tracked group on a bot that is in it; returns the failures."""
+    group_ids = live_roster.groups
+    if not group_ids:
+        return []
+
+    async def resync(bot: Bot, group_id: int) -> bool:
+        await live_roster.resync(bot, group_id)
+        return True
+
+    memberships = await fetch_memberships(bots, settings.member_fetch_timeout_seconds)
+    results = await run_sharded(
+        group_ids,
+        bots,
+        memberships,
+        resync,
+        concurrency_per_bot=settings.bot_concurrency,
+        is_connected=lambda bot_id: bot_id in get_driver().bots,
+    )
+    return [group_id for group_id, ok in results.items() if not ok]
+
+
+@driver.on_bot_connect
+async def _on_bot_connect(bot: Bot) -> None:
+    global _warm_up_task
+    if settings.render_warm_up and _warm_up_task is None:
+        _warm_up_task = asyncio.create_task(_warm_up_renderer(), name="qbot-render-warm-up")
+
+
+async def _warm_up_renderer() -> None:
+    # Runs once the OneBot connection is up, so start-up never waits on matplotlib.
+    try:
+        if render_pool is not None:
+            await render_pool.warm_up()
+        else:
+            await asyncio.to_thread(plotter.preload, settings.font_path)
+    except Exception:
+        logger.exception("Renderer warm-up failed")
+    else:
+        logger.info("qbot renderer warmed up")
+
+
+@driver.on_shutdown
+async def _on_shutdown() -> None:
+    try:
+        await usage_sink.close()
+    except Exception:
+        logger.exception("Command usage sink drain failed: {} rows lost", usage_sink.pending)
+    if render_pool is not None:
+        await render_pool.close()
+    await repo.close()
+    logger.info("qbot repository closed")
 
 
 @scorestat_msg.handle()
@@ -230,6 +388,22 @@ async def _handle_scorestat(bot: Bot, event: GroupMessageEvent) -> None:
     logger.info("Whitelist check: group_id={} allowed={}", event.group_id, allowed)
 
 
+@member_notice.handle()
+async def _handle_member_notice(bot: Bot, event: NoticeEvent) -> None:
+    if event.notice_type not in MEMBER_NOTICE_TYPES:
+        return
+    payload = event.model_dump()
+    group_id = payload.get("group_id")
+    if not isinstance(group_id, int):
+        return
+    member_cache.invalidate(group_id)
+    if roster is not None:
+        try:
+            await roster.handle_notice(bot, payload)
+        except Exception:
+            logger.exception("Roster notice apply failed for group {}", group_id)
+
+
 def _extract_plain_text_from_message_payload(message: object) -> str:
     if isinstance(message, str):
         return message.strip()
@@ -262,13 +436,13 @@ def _parse_bot_command(raw_text: str) -> tuple[str, str] | None:
         .lower()
     )
     command_re = re.compile(
-        r"^/?\s*(stat|scorestat|rank-comp|rank|set|h)(?:\s+(help|win))?\s*$"
+        r"^/?\s*(stat|scorestat|rank-comp|rank|set|h)(?:\s+(help|win|all))?\s*$"
     )
     m = command_re.match(normalized)
     if m:
         command = m.group(1)
         action_token = m.group(2)
-        if action_token == "win" and command != "rank":
+        if action_token in {"win", "all"} and command != "rank":
             return None
         action = action_token if action_token else "run"
         return (command, action)
@@ -291,21 +465,12 @@ async def _handle_command(
     action: str,
     matcher=None,
 ) -> None:
-    try:
-        await repo.log_command_usage(
-            group_id=group_id,
-            user_id=user_id,
-            command=_normalize_usage_command(command),
-            action=action,
-        )
-    except Exception:
-        logger.exception(
-            "Command usage log failed: group_id={} user_id={} command={} action={}",
-            group_id,
-            user_id,
-            command,
-            action,
-        )
+    usage_sink.record(
+        group_id=group_id,
+        user_id=user_id,
+        command=_normalize_usage_command(command),
+        action=action,
+    )
 
     if command in {"stat", "scorestat"}:
         if action == "help":
@@ -322,6 +487,9 @@ async def _handle_command(
         if action == "help":
             await _send_text(bot, group_id, RANK_HELP_TEXT, matcher=matcher)
             return
+        if action == "all":
+            await _send_standings(bot, group_id, matcher)
+            return
         rank_result = await service.query_self_rank(
             bot,
             group_id,
@@ -346,6 +514,22 @@ async def _handle_command(
         return
 
 
+async def _send_standings(bot: Bot, group_id: int, matcher) -> None:
+    chunks = await service.query_standings(bot, group_id)
+    if len(chunks) == 1:
+        await _send_text(bot, group_id, chunks[0], matcher=matcher)
+        return
+    nodes = [
+        {"type": "node", "data": {"name": "qbot", "uin": bot.self_id, "content": chunk}}
+        for chunk in chunks
+    ]
+    try:
+        await bot.call_api("send_group_forward_msg", group_id=group_id, messages=nodes)
+    except ActionFailed as exc:
+        logger.warning("Group {} standings forward send failed: {}", group_id, exc)
+        await _send_text(bot, group_id, "全群排名发送失败（合并转发接口异常），请查看 bot 日志。", matcher=matcher)
+
+
 async def _run_scorestat_with_cooldown(bot: Bot, group_id: int, matcher) -> None:
     now = monotonic()
     last = _last_manual_trigger_at.get(group_id, 0.0)
@@ -358,13 +542,45 @@ async def _run_scorestat_with_cooldown(bot: Bot, group_id: int, matcher) -> None
         await matcher.finish("统计执行失败（可能是群成员接口或图片发送失败），请查看 bot 日志。")
 
 
+async def _fetch_cross_group_members(
+    bot: Bot, group_id: int
+) -> tuple[Sequence[dict] | None, Sequence[dict] | None]:
+    """Fetch the local and 浙计 lists concurrently; a side that fails is None."""
+    results = await asyncio.gather(
+        members.get(bot, group_id),
+        members.get(bot, settings.zheji_group_id),
+        return_exceptions=True,
+    )
+    fetched: list[Sequence[dict] | None] = []
+    for target, result in zip((group_id, settings.zheji_group_id), results, strict=True):
+        if isinstance(result, BaseException):
+            logger.opt(exception=result).warning("Member list fetch failed for group {}", target)
+            fetched.append(None)
+        else:
+            fetched.append(result)
+    return fetched[0], fetched[1]
+
+
 async def _run_set_overlap_check(bot: Bot, group_id: int, matcher) -> None:
-    try:
-        local_members = await get_group_members(bot, group_id)
-        zheji_members = await get_group_members(bot, settings.zheji_group_id)
-    except Exception:
-        logger.exception("Set overlap check failed to fetch group member list")
+    local_members, zheji_members = await _fetch_cross_group_members(bot, group_id)
+    if local_members is None and zheji_members is None:
         await matcher.finish("名单查询失败，请检查 OneBot 接口和群可见性。")
+    if local_members is None or zheji_members is None:
+        if local_members is not None:
+            available = f"浙软考生数：{len(collect_candidates(local_members, is_zheruan_candidate))}"
+            failed = "浙计"
+        else:
+            available = f"浙计考生数：{len(collect_candidates(zheji_members, is_zheji_candidate))}"
+            failed = "浙软"
+        text = "\n".join(
+            [
+                "跨群考生重合检测：浙软 vs 浙计",
+                available,
+                f"{failed}名单查询失败（超时或接口异常），暂无法检测重合。",
+            ]
+        )
+        await _send_text(bot, group_id, text, matcher=matcher)
+        return
 
     local_candidates = collect_candidates(local_members, is_zheruan_candidate)
     zheji_candidates = collect_candidates(zheji_members, is_zheji_candidate)
@@ -377,76 +593,55 @@ async def _run_set_overlap_check(bot: Bot, group_id: int, matcher) -> None:
     await _send_text(bot, group_id, result, matcher=matcher)
 
 
-def _compute_rank_stats(scores: list[int], own_score: int) -> tuple[int, int, int, float]:
-    sorted_scores = sorted(scores, reverse=True)
-    return rank_and_percentile(sorted_scores, own_score)
-
-
-def _collect_scores(members: list[dict], score_parser) -> list[int]:
-    scores: list[int] = []
-    for member in members:
-        profile = member_profile_text(member)
-        score = score_parser(profile)
-        if score is not None:
-            scores.append(score)
-    return scores
-
-
-def _extract_local_self_score(local_members: list[dict], user_id: int) -> tuple[int | None, str]:
-    self_found = False
-    self_profile = ""
-    self_score: int | None = None
-
+def _explain_missing_self_score(local_members: Sequence[dict], user_id: int) -> str:
     for member in local_members:
         uid = member.get("user_id")
         if not isinstance(uid, int) or uid != user_id:
             continue
-        self_found = True
-        self_profile = member_profile_text(member)
-        self_score = parse_zheruan_score(self_profile)
-        break
-
-    if not self_found:
-        return None, "浙软：未找到你的群成员记录。"
-    if self_score is None:
-        if not self_profile:
-            return None, "浙软：你的名片/昵称为空，无法计算。"
-        return None, "浙软：你的名片/昵称不符合格式（分数-名字）。"
-    return self_score, ""
+        if not member_profile_text(member):
+            return "浙软：你的名片/昵称为空，无法计算。"
+        return "浙软：你的名片/昵称不符合格式（分数-名字）。"
+    return "浙软：未找到你的群成员记录。"
 
 
 async def _run_rank_comp(bot: Bot, group_id: int, user_id: int, matcher) -> None:
-    try:
-        local_members = list(await get_group_members(bot, group_id))
-        zheji_members = list(await get_group_members(bot, settings.zheji_group_id))
-    except Exception:
-        logger.exception("Rank comp failed to fetch group member list")
+    local_members, zheji_members = await _fetch_cross_group_members(bot, group_id)
+    if local_members is None:
         await matcher.finish("查询失败：无法拉取群成员列表，请检查 OneBot 接口。")
 
-    self_score, self_score_error = _extract_local_self_score(local_members, user_id)
+    local, local_index = service.score_index(group_id, local_members, ZHERUAN)
+    self_score = local.score_of(user_id)
     if self_score is None:
+        self_score_error = _explain_missing_self_score(local_members, user_id)
         await _send_text(bot, group_id, "\n".join(["=== 跨群个人排名 ===", f"QQ：{user_id}", self_score_error]), matcher=matcher)
         return
 
-    local_scores = _collect_scores(local_members, parse_zheruan_score)
-    zheji_scores = _collect_scores(zheji_members, parse_zheji_score)
-    if not local_scores:
+    zheji_index = (
+        service.score_index(settings.zheji_group_id, zheji_members, ZHEJI)[1]
+        if zheji_members is not None
+        else None
+    )
+    if not local_index.total:
         await _send_text(bot, group_id, "浙软暂无有效考生样本，无法换算。", matcher=matcher)
         return
-    if not zheji_scores:
+    if zheji_index is not None and not zheji_index.total:
         await _send_text(bot, group_id, "浙计暂无有效考生样本，无法换算。", matcher=matcher)
         return
 
-    local_best, _, local_tie, local_pct = _compute_rank_stats(local_scores, self_score)
-    zheji_best, _, zheji_tie, zheji_pct = _compute_rank_stats(zheji_scores, self_score)
-
+    local_best, _, local_tie, local_pct = local_index.rank(self_score)
     table_lines = [
         "=== 跨群个人排名 ===",
         "学院 | 分数 | 位次 | 百分位",
-        f"浙软 | {self_score} | {local_best}/{len(local_scores)}(同分{local_tie}) | {local_pct:.1f}%",
-        f"浙计 | {self_score}* | {zheji_best}/{len(zheji_scores)}(同分{zheji_tie}) | {zheji_pct:.1f}%",
-        "* 浙计按浙软同分换算",
+        f"浙软 | {self_score} | {local_best}/{local_index.total}(同分{local_tie}) | {local_pct:.1f}%",
     ]
+    if zheji_index is None:
+        table_lines.append("浙计 | - | 查询失败（超时或接口异常） | -")
+    else:
+        zheji_best, _, zheji_tie, zheji_pct = zheji_index.rank(self_score)
+        table_lines.append(
+            f"浙计 | {self_score}* | {zheji_best}/{zheji_index.total}(同分{zheji_tie}) | {zheji_pct:.1f}%"
+        )
+    table_lines.append("* 浙计按浙软同分换算")
     text = "\n".join(table_lines)
     await _send_text(bot, group_id, text, matcher=matcher)
 
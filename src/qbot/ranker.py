@@ -1,5 +1,12 @@
 from __future__ import annotations
 
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from itertools import accumulate
+
+from qbot.bucketizer import SCORE_MAX, SCORE_MIN
+from qbot.models import Cutoffs, CutoffPolicy, MemberRank
+
 
 def rank_and_percentile(
     sorted_scores: list[int], own_score: int
@@ -13,3 +20,158 @@ def rank_and_percentile(
     # percentage of members whose score is >= own_score.
     percentile = ((higher_count + tie_count) / len(sorted_scores)) * 100
     return best_rank, worst_rank, tie_count, percentile
+
+
+
+class ScoreIndex:
+    """Score histogram over the 350–500 domain with cumulative counts from the top.
+
+    Built in O(n) from a score list; every query afterwards only touches the
+    151 slots, so rank lookups no longer depend on the group size.
+    """
+
+    __slots__ = ("counts", "total", "_from_top", "_sum_from_top")
+
+    def __init__(self, counts: Sequence[int]) -> None:
+        if len(counts) != SCORE_MAX - SCORE_MIN + 1:
+            raise ValueError("ScoreIndex needs one count per score in 350-500")
+        self.counts = tuple(counts)
+        # Slot j of the cumulative arrays covers scores >= SCORE_MAX - j.
+        descending = self.counts[::-1]
+        self._from_top = list(accumulate(descending))
+        self._sum_from_top = list(
+            accumulate(c * (SCORE_MAX - j) for j, c in enumerate(descending))
+        )
+        self.total = self._from_top[-1]
+
+    @classmethod
+    def from_scores(cls, scores: Iterable[int]) -> ScoreIndex:
+        counts = [0] * (SCORE_MAX - SCORE_MIN + 1)
+        for score in scores:
+            if SCORE_MIN <= score <= SCORE_MAX:
+                counts[score - SCORE_MIN] += 1
+        return cls(counts)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def count_at_least(self, score: int) -> int:
+        if score > SCORE_MAX:
+            return 0
+        if score <= SCORE_MIN:
+            return self.total
+        return self._from_top[SCORE_MAX - score]
+
+    def tie_count(self, score: int) -> int:
+        if SCORE_MIN <= score <= SCORE_MAX:
+            return self.counts[score - SCORE_MIN]
+        return 0
+
+    def rank(self, own_score: int) -> tuple[int, int, int, float]:
+        """Same result as `rank_and_percentile` on the sorted score list."""
+        tie_count = self.tie_count(own_score)
+        at_least = self.count_at_least(own_score)
+        best_rank = 1 + at_least - tie_count
+        worst_rank = best_rank + tie_count - 1
+        percentile = (at_least / self.total) * 100
+        return best_rank, worst_rank, tie_count, percentile
+
+    def score_at_rank(self, rank: int) -> int | None:
+        """Score of the `rank`-th highest member (1-based), None if out of range."""
+        if rank < 1 or rank > self.total:
+            return None
+        return SCORE_MAX - bisect_left(self._from_top, rank)
+
+    def avg_top(self, n: int) -> float | None:
+        """Mean of the top `n` scores, None when there are fewer than `n`."""
+        if n < 1 or n > self.total:
+            return None
+        j = bisect_left(self._from_top, n)
+        above = self._from_top[j - 1] if j else 0
+        total = (self._sum_from_top[j - 1] if j else 0) + (n - above) * (SCORE_MAX - j)
+        return total / n
+
+
+def rank_all(
+    user_ids: Sequence[int],
+    scores: Sequence[int],
+    index: ScoreIndex | None = None,
+) -> list[MemberRank]:
+    """Rank every member in one pass, best first; ties keep input order.
+
+    Members are bucketed by score instead of sorted, and each distinct score
+    is ranked once through the index, so the whole group costs O(n).
+    """
+    if index is None:
+        index = ScoreIndex.from_scores(scores)
+    by_score: list[list[int]] = [[] for _ in range(SCORE_MAX - SCORE_MIN + 1)]
+    for position, score in enumerate(scores):
+        if SCORE_MIN <= score <= SCORE_MAX:
+            by_score[score - SCORE_MIN].append(position)
+
+    ranked: list[MemberRank] = []
+    for offset in range(len(by_score) - 1, -1, -1):
+        positions = by_score[offset]
+        if not positions:
+            continue
+        score = SCORE_MIN + offset
+        best_rank, worst_rank, tie_count, percentile = index.rank(score)
+        for position in positions:
+            ranked.append(
+                MemberRank(
+                    user_id=user_ids[position],
+                    score=score,
+                    best_rank=best_rank,
+                    worst_rank=worst_rank,
+                    tie_count=tie_count,
+                    percentile=percentile,
+                )
+            )
+    return ranked
+
+
+def compute_cutoffs(
+    index: ScoreIndex,
+    ranks: Iterable[int] = (),
+    averages: Iterable[int] = (),
+) -> Cutoffs:
+    """Cutoff score for every rank and mean of every top-N in one walk of the histogram.
+
+    Thresholds are sorted once and resolved while walking the 151 slots from
+    the top, so the cost does not grow with the group size or, beyond the
+    sort, with the number of thresholds.
+    """
+    result = Cutoffs(scores=dict.fromkeys(ranks), averages=dict.fromkeys(averages))
+    rank_set = result.scores.keys()
+    average_set = result.averages.keys()
+    wanted = sorted(k for k in rank_set | average_set if k >= 1)
+
+    pending = iter(wanted)
+    k = next(pending, None)
+    seen = 0
+    seen_sum = 0
+    for offset in range(len(index.counts) - 1, -1, -1):
+        if k is None:
+            break
+        count = index.counts[offset]
+        if not count:
+            continue
+        score = SCORE_MIN + offset
+        while k is not None and k <= seen + count:
+            if k in rank_set:
+                result.scores[k] = score
+            if k in average_set:
+                result.averages[k] = (seen_sum + (k - seen) * score) / k
+            k = next(pending, None)
+        seen += count
+        seen_sum += count * score
+    return result
+
+
+def policy_cutoffs(index: ScoreIndex, policy: CutoffPolicy) -> Cutoffs:
+    """All cutoffs a policy's summary and rank queries need, from one pass."""
+    return compute_cutoffs(
+        index,
+        ranks=(*policy.ranks, policy.retest_rank, policy.target_rank),
+        averages=(*policy.averages, policy.target_rank),
+    )
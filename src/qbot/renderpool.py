@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, TypeVar
+
+from nonebot import logger
+
+T = TypeVar("T")
+
+# Lower runs first: a manual /stat jumps ahead of queued scheduled renders.
+MANUAL_PRIORITY = 0
+SCHEDULED_PRIORITY = 10
+
+
+def _warm_worker(font_path: str | None) -> None:
+    # Import matplotlib and register the font once per worker rather than on
+    # the first render.
+    from qbot import plotter
+
+    plotter.warm_up(font_path)
+
+
+class RenderPool:
+    """Runs chart rendering in warm worker processes, off the event loop.
+
+    Jobs wait in a bounded priority queue; `render` blocks while the queue is
+    full. Each worker process is fed by one dispatcher task, so at most
+    `workers` renders run at once and the rest are ordered by priority.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        font_path: str | None = None,
+        max_pending: int = 32,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.font_path = font_path
+        self._queue: asyncio.PriorityQueue[tuple[int, int, asyncio.Future[Any], Callable[[], Any]]] = (
+            asyncio.PriorityQueue(maxsize=max(1, max_pending))
+        )
+        self._seq = itertools.count()
+        self._executor: ProcessPoolExecutor | None = None
+        self._dispatchers: list[asyncio.Task[None]] = []
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._dispatchers:
+            return
+        self._executor = self._new_executor()
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch(), name=f"qbot-render-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def warm_up(self) -> None:
+        """Start the worker processes now instead of on the first render."""
+        await asyncio.gather(
+            *(self.render(_warm_worker, self.font_path) for _ in range(self.workers))
+        )
+
+    async def render(
+        self,
+        fn: Callable[..., T],
+        /,
+        *args: Any,
+        priority: int = SCHEDULED_PRIORITY,
+        **kwargs: Any,
+    ) -> T:
+        """Run `fn(*args, **kwargs)` in a worker; arguments must be picklable."""
+        if not self._dispatchers:
+            raise RuntimeError("RenderPool.start() must be called before use")
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        await self._queue.put((priority, next(self._seq), future, partial(fn, *args, **kwargs)))
+        return await future
+
+    async def close(self) -> None:
+        dispatchers, self._dispatchers = self._dispatchers, []
+        for task in dispatchers:
+            task.cancel()
+        await asyncio.gather(*dispatchers, return_exceptions=True)
+        while not self._queue.empty():
+            _, _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("RenderPool closed"))
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: workers must not inherit the bot's event loop and sockets.
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            initargs=(self.font_path,),
+        )
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, future, job = await self._queue.get()
+            if future.done():
+                continue
+            executor = self._executor
+            assert executor is not None
+            try:
+                result = await loop.run_in_executor(executor, job)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except BrokenProcessPool as exc:
+                logger.warning("Render worker died; restarting the render pool")
+                if self._executor is executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._executor = self._new_executor()
+                if not future.done():
+                    future.set_exception(exc)
+            except BaseException as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                if not future.done():
+                    future.set_result(result)
@@ -1,57 +1,490 @@
 from __future__ import annotations
 
+import asyncio
+import struct
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 import aiosqlite
 
-from qbot.models import BucketCount, SnapshotMeta
+from qbot.models import BucketCount, SnapshotMeta, TrendRollup
+
+# WAL lets the reader pool keep answering `/rank` style queries while the
+# writer commits a snapshot; NORMAL sync is durable across app crashes in WAL.
+_COMMON_PRAGMAS = (
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+)
+_WRITER_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    *_COMMON_PRAGMAS,
+)
+_READER_PRAGMAS = (
+    *_COMMON_PRAGMAS,
+    "PRAGMA query_only = ON",
+)
+
+
+# Schema as first shipped (user_version 1). Later layouts are reached through
+# the ordered migrations below so existing databases upgrade in place.
+_BASE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS score_snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_id INTEGER NOT NULL,
+        collected_at TEXT NOT NULL,
+        valid_member_count INTEGER NOT NULL,
+        max_score INTEGER NOT NULL,
+        upper_bound INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS score_buckets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        snapshot_id INTEGER NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        bucket_end INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        FOREIGN KEY (snapshot_id) REFERENCES score_snapshots(id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_snapshots_group_time
+    ON score_snapshots(group_id, collected_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_snapshots_time
+    ON score_snapshots(collected_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_buckets_snapshot
+    ON score_buckets(snapshot_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS command_usage_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        group_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        command TEXT NOT NULL,
+        action TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_cmd_usage_group_user_time
+    ON command_usage_logs(group_id, user_id, created_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_cmd_usage_time
+    ON command_usage_logs(created_at)
+    """,
+)
+
+# Trend windows up to RAW_TREND_MAX_HOURS read raw snapshots; longer windows
+# read the hourly rollup, and beyond HOURLY_TREND_MAX_HOURS the daily one.
+RAW_TREND_MAX_HOURS = 48
+HOURLY_TREND_MAX_HOURS = 24 * 14
+_ROLLUP_TABLES = {
+    "hour": "score_rollups_hourly",
+    "day": "score_rollups_daily",
+}
+
+BUCKET_BASE_SCORE = 350
+BUCKET_WIDTH = 5
+_UINT16_MAX = 0xFFFF
+
+
+def _pack_counts(counts: Sequence[int]) -> bytes:
+    if any(c < 0 or c > _UINT16_MAX for c in counts):
+        raise ValueError("bucket counts must fit in uint16")
+    return struct.pack(f"<{len(counts)}H", *counts)
+
+
+def _unpack_counts(blob: bytes) -> tuple[int, ...]:
+    return struct.unpack(f"<{len(blob) // 2}H", blob)
+
+
+def _pack_buckets(buckets: Sequence[BucketCount]) -> tuple[int, int, bytes]:
+    """Pack contiguous equal-width buckets into (start, width, uint16 LE blob)."""
+    if not buckets:
+        return BUCKET_BASE_SCORE, BUCKET_WIDTH, b""
+    start = buckets[0].start
+    width = buckets[1].start - start if len(buckets) > 1 else BUCKET_WIDTH
+    for i, bucket in enumerate(buckets):
+        if bucket.start != start + i * width:
+            raise ValueError("buckets must be contiguous with a fixed width")
+    return start, width, _pack_counts([b.count for b in buckets])
+
+
+def _unpack_buckets(start: int, width: int, upper_bound: int, blob: bytes) -> list[BucketCount]:
+    return [
+        BucketCount(
+            start=start + i * width,
+            end=min(start + i * width + width - 1, upper_bound),
+            count=count,
+        )
+        for i, count in enumerate(_unpack_counts(blob))
+    ]
+
+
+async def _create_base_schema(db: aiosqlite.Connection) -> None:
+    for statement in _BASE_SCHEMA:
+        await db.execute(statement)
+
+
+async def _migrate_packed_buckets(db: aiosqlite.Connection) -> None:
+    await db.execute(
+        f"ALTER TABLE score_snapshots ADD COLUMN bucket_start INTEGER NOT NULL DEFAULT {BUCKET_BASE_SCORE}"
+    )
+    await db.execute(
+        f"ALTER TABLE score_snapshots ADD COLUMN bucket_width INTEGER NOT NULL DEFAULT {BUCKET_WIDTH}"
+    )
+    await db.execute("ALTER TABLE score_snapshots ADD COLUMN bucket_counts BLOB NOT NULL DEFAULT x''")
+
+    rows = await db.execute_fetchall(
+        """
+        SELECT snapshot_id, bucket_start, count
+        FROM score_buckets
+        ORDER BY snapshot_id, bucket_start
+        """
+    )
+    grouped: dict[int, dict[int, int]] = {}
+    for snapshot_id, bucket_start, count in rows:
+        grouped.setdefault(int(snapshot_id), {})[int(bucket_start)] = int(count)
+
+    packed: list[tuple[int, bytes, int]] = []
+    for snapshot_id, by_start in grouped.items():
+        start = min(by_start)
+        slots = (max(by_start) - start) // BUCKET_WIDTH + 1
+        counts = [by_start.get(start + i * BUCKET_WIDTH, 0) for i in range(slots)]
+        packed.append((start, _pack_counts(counts), snapshot_id))
+    await db.executemany(
+        "UPDATE score_snapshots SET bucket_start = ?, bucket_counts = ? WHERE id = ?",
+        packed,
+    )
+    await db.execute("DROP TABLE score_buckets")
+
+
+def trend_resolution(window_hours: int) -> str:
+    if window_hours <= RAW_TREND_MAX_HOURS:
+        return "raw"
+    if window_hours <= HOURLY_TREND_MAX_HOURS:
+        return "hour"
+    return "day"
+
+
+_PERIOD_MS = {
+    "hour": 3_600_000,
+    "day": 86_400_000,
+}
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_ONE_MS = timedelta(milliseconds=1)
+
+
+def to_epoch_ms(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return (dt - _EPOCH) // _ONE_MS
+
+
+def from_epoch_ms(ms: int) -> datetime:
+    return _EPOCH + timedelta(milliseconds=ms)
+
+
+def _iso_to_epoch_ms(value: str | int) -> int:
+    if isinstance(value, int):
+        return value
+    return to_epoch_ms(datetime.fromisoformat(value))
+
+
+def _period_start_ms(epoch_ms: int, resolution: str) -> int:
+    return epoch_ms - epoch_ms % _PERIOD_MS[resolution]
+
+
+def _period_start_iso(collected_at: datetime, resolution: str) -> str:
+    collected_at = collected_at.astimezone(UTC)
+    if resolution == "hour":
+        return collected_at.replace(minute=0, second=0, microsecond=0).isoformat()
+    return collected_at.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+
+async def _upsert_rollups(
+    db: aiosqlite.Connection,
+    group_id: int,
+    count: int,
+    collected_at: str | int,
+    period_starts: dict[str, str | int],
+) -> None:
+    for resolution, table in _ROLLUP_TABLES.items():
+        await db.execute(
+            f"""
+            INSERT INTO {table} (
+                group_id, period_start, min_count, max_count, last_count,
+                sum_count, sample_count, last_at
+            ) VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (group_id, period_start) DO UPDATE SET
+                min_count = MIN(min_count, excluded.min_count),
+                max_count = MAX(max_count, excluded.max_count),
+                last_count = CASE
+                    WHEN excluded.last_at >= last_at THEN excluded.last_count
+                    ELSE last_count
+                END,
+                sum_count = sum_count + excluded.sum_count,
+                sample_count = sample_count + 1,
+                last_at = MAX(last_at, excluded.last_at)
+            """,
+            (
+                group_id,
+                period_starts[resolution],
+                count,
+                count,
+                count,
+                count,
+                collected_at,
+            ),
+        )
+
+
+async def _migrate_trend_rollups(db: aiosqlite.Connection) -> None:
+    for table in _ROLLUP_TABLES.values():
+        await db.execute(
+            f"""
+            CREATE TABLE {table} (
+                group_id INTEGER NOT NULL,
+                period_start TEXT NOT NULL,
+                min_count INTEGER NOT NULL,
+                max_count INTEGER NOT NULL,
+                last_count INTEGER NOT NULL,
+                sum_count INTEGER NOT NULL,
+                sample_count INTEGER NOT NULL,
+                last_at TEXT NOT NULL,
+                PRIMARY KEY (group_id, period_start)
+            ) WITHOUT ROWID
+            """
+        )
+    rows = await db.execute_fetchall(
+        """
+        SELECT group_id, collected_at, valid_member_count
+        FROM score_snapshots
+        ORDER BY collected_at, id
+        """
+    )
+    for group_id, collected_at, count in rows:
+        parsed = datetime.fromisoformat(collected_at)
+        await _upsert_rollups(
+            db,
+            int(group_id),
+            int(count),
+            collected_at,
+            {resolution: _period_start_iso(parsed, resolution) for resolution in _ROLLUP_TABLES},
+        )
+
+
+async def _migrate_epoch_ms(db: aiosqlite.Connection) -> None:
+    await db.create_function("iso_to_ms", 1, _iso_to_epoch_ms, deterministic=True)
+
+    await db.execute(
+        """
+        CREATE TABLE score_snapshots_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER NOT NULL,
+            collected_at INTEGER NOT NULL,
+            valid_member_count INTEGER NOT NULL,
+            max_score INTEGER NOT NULL,
+            upper_bound INTEGER NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            bucket_width INTEGER NOT NULL,
+            bucket_counts BLOB NOT NULL
+        )
+        """
+    )
+    await db.execute(
+        """
+        INSERT INTO score_snapshots_new
+        SELECT id, group_id, iso_to_ms(collected_at), valid_member_count, max_score,
+               upper_bound, bucket_start, bucket_width, bucket_counts
+        FROM score_snapshots
+        """
+    )
+    await db.execute("DROP TABLE score_snapshots")
+    await db.execute("ALTER TABLE score_snapshots_new RENAME TO score_snapshots")
+    # Covering index: trend and last-count queries never touch the table rows.
+    await db.execute(
+        """
+        CREATE INDEX idx_snapshots_group_time_count
+        ON score_snapshots(group_id, collected_at, valid_member_count)
+        """
+    )
+    await db.execute("CREATE INDEX idx_snapshots_time ON score_snapshots(collected_at)")
+
+    await db.execute(
+        """
+        CREATE TABLE command_usage_logs_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            group_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            command TEXT NOT NULL,
+            action TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+        """
+    )
+    await db.execute(
+        """
+        INSERT INTO command_usage_logs_new
+        SELECT id, group_id, user_id, command, action, iso_to_ms(created_at)
+        FROM command_usage_logs
+        """
+    )
+    await db.execute("DROP TABLE command_usage_logs")
+    await db.execute("ALTER TABLE command_usage_logs_new RENAME TO command_usage_logs")
+    await db.execute(
+        """
+        CREATE INDEX idx_cmd_usage_group_user_time
+        ON command_usage_logs(group_id, user_id, created_at)
+        """
+    )
+    await db.execute("CREATE INDEX idx_cmd_usage_time ON command_usage_logs(created_at)")
+
+    for table in _ROLLUP_TABLES.values():
+        await db.execute(
+            f"""
+            CREATE TABLE {table}_new (
+                group_id INTEGER NOT NULL,
+                period_start INTEGER NOT NULL,
+                min_count INTEGER NOT NULL,
+                max_count INTEGER NOT NULL,
+                last_count INTEGER NOT NULL,
+                sum_count INTEGER NOT NULL,
+                sample_count INTEGER NOT NULL,
+                last_at INTEGER NOT NULL,
+                PRIMARY KEY (group_id, period_start)
+            ) WITHOUT ROWID
+            """
+        )
+        await db.execute(
+            f"""
+            INSERT INTO {table}_new
+            SELECT group_id, iso_to_ms(period_start), min_count, max_count, last_count,
+                   sum_count, sample_count, iso_to_ms(last_at)
+            FROM {table}
+            """
+        )
+        await db.execute(f"DROP TABLE {table}")
+        await db.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+async def _migrate_snapshot_fingerprints(db: aiosqlite.Connection) -> None:
+    await db.execute("ALTER TABLE score_snapshots ADD COLUMN fingerprint BLOB")
+    # One row per group: the last run that found its snapshot unchanged.
+    await db.execute(
+        """
+        CREATE TABLE snapshot_heartbeats (
+            group_id INTEGER PRIMARY KEY,
+            snapshot_id INTEGER NOT NULL,
+            checked_at INTEGER NOT NULL,
+            unchanged_runs INTEGER NOT NULL
+        )
+        """
+    )
+
+
+# Index i brings a database from user_version i to i + 1.
+_MIGRATIONS: tuple[Callable[[aiosqlite.Connection], Awaitable[None]], ...] = (
+    _create_base_schema,
+    _migrate_packed_buckets,
+    _migrate_trend_rollups,
+    _migrate_epoch_ms,
+    _migrate_snapshot_fingerprints,
+)
 
 
 class ScoreRepository:
-    def __init__(self, db_path: Path) -> None:
+    def __init__(self, db_path: Path, reader_pool_size: int = 2) -> None:
         self._db_path = db_path
+        self._reader_pool_size = max(1, reader_pool_size)
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+    async def _connect(self, pragmas: tuple[str, ...]) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self._db_path)
+        for pragma in pragmas:
+            await db.execute(pragma)
+        return db
 
     async def init(self) -> None:
+        if self._writer is not None:
+            return
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
-        async with aiosqlite.connect(self._db_path) as db:
-            await db.executescript(
-                """
-                CREATE TABLE IF NOT EXISTS score_snapshots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    group_id INTEGER NOT NULL,
-                    collected_at TEXT NOT NULL,
-                    valid_member_count INTEGER NOT NULL,
-                    max_score INTEGER NOT NULL,
-                    upper_bound INTEGER NOT NULL
-                );
-
-                CREATE TABLE IF NOT EXISTS score_buckets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    snapshot_id INTEGER NOT NULL,
-                    bucket_start INTEGER NOT NULL,
-                    bucket_end INTEGER NOT NULL,
-                    count INTEGER NOT NULL,
-                    FOREIGN KEY (snapshot_id) REFERENCES score_snapshots(id)
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_snapshots_group_time
-                ON score_snapshots(group_id, collected_at);
-
-                CREATE TABLE IF NOT EXISTS command_usage_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    group_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    command TEXT NOT NULL,
-                    action TEXT NOT NULL,
-                    created_at TEXT NOT NULL
-                );
-
-                CREATE INDEX IF NOT EXISTS idx_cmd_usage_group_user_time
-                ON command_usage_logs(group_id, user_id, created_at);
-                """
-            )
+        self._writer = await self._connect(_WRITER_PRAGMAS)
+        async with self._write_lock:
+            await self._migrate(self._writer)
+
+        for _ in range(self._reader_pool_size):
+            reader = await self._connect(_READER_PRAGMAS)
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+
+    async def close(self) -> None:
+        readers, self._readers = self._readers, []
+        self._idle_readers = asyncio.Queue()
+        for reader in readers:
+            await reader.close()
+        if self._writer is not None:
+            writer, self._writer = self._writer, None
+            async with self._write_lock:
+                await writer.close()
+
+    @staticmethod
+    async def _migrate(db: aiosqlite.Connection) -> None:
+        rows = await db.execute_fetchall("PRAGMA user_version")
+        version = int(rows[0][0])
+        if version >= len(_MIGRATIONS):
+            return
+        rows = await db.execute_fetchall("SELECT COUNT(*) FROM sqlite_master")
+        existing = int(rows[0][0]) > 0
+        for target, migration in enumerate(_MIGRATIONS[version:], start=version + 1):
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                await migration(db)
+                await db.execute(f"PRAGMA user_version = {target}")
+            except BaseException:
+                await db.rollback()
+                raise
             await db.commit()
+        if existing:
+            # Reclaim the pages freed by rewritten tables on upgraded databases.
+            await db.execute("VACUUM")
+
+    @asynccontextmanager
+    async def _write(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with self._write_lock:
+            db = self._writer
+            if db is None:
+                raise RuntimeError("ScoreRepository.init() must be awaited before use")
+            try:
+                yield db
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+
+    @asynccontextmanager
+    async def _read(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self._readers:
+            raise RuntimeError("ScoreRepository.init() must be awaited before use")
+        db = await self._idle_readers.get()
+        try:
+            yield db
+        finally:
+            self._idle_readers.put_nowait(db)
 
     async def insert_snapshot(
         self,
@@ -60,28 +493,41 @@ class ScoreRepository:
         max_score: int,
         upper_bound: int,
         buckets: list[BucketCount],
+        fingerprint: bytes | None = None,
     ) -> SnapshotMeta:
-        collected_at = datetime.now(UTC)
-        async with aiosqlite.connect(self._db_path) as db:
+        collected_ms = to_epoch_ms(datetime.now(UTC))
+        collected_at = from_epoch_ms(collected_ms)
+        bucket_start, bucket_width, bucket_counts = _pack_buckets(buckets)
+        async with self._write() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO score_snapshots (
-                    group_id, collected_at, valid_member_count, max_score, upper_bound
-                ) VALUES (?, ?, ?, ?, ?)
+                    group_id, collected_at, valid_member_count, max_score, upper_bound,
+                    bucket_start, bucket_width, bucket_counts, fingerprint
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (group_id, collected_at.isoformat(), valid_member_count, max_score, upper_bound),
+                (
+                    group_id,
+                    collected_ms,
+                    valid_member_count,
+                    max_score,
+                    upper_bound,
+                    bucket_start,
+                    bucket_width,
+                    bucket_counts,
+                    fingerprint,
+                ),
             )
             snapshot_id = cursor.lastrowid
             assert snapshot_id is not None
-
-            await db.executemany(
-                """
-                INSERT INTO score_buckets (snapshot_id, bucket_start, bucket_end, count)
-                VALUES (?, ?, ?, ?)
-                """,
-                [(snapshot_id, b.start, b.end, b.count) for b in buckets],
+            await db.execute("DELETE FROM snapshot_heartbeats WHERE group_id = ?", (group_id,))
+            await _upsert_rollups(
+                db,
+                group_id,
+                valid_member_count,
+                collected_ms,
+                {r: _period_start_ms(collected_ms, r) for r in _ROLLUP_TABLES},
             )
-            await db.commit()
 
         return SnapshotMeta(
             id=int(snapshot_id),
@@ -90,65 +536,247 @@ class ScoreRepository:
             valid_member_count=valid_member_count,
             max_score=max_score,
             upper_bound=upper_bound,
+            fingerprint=fingerprint,
+        )
+
+    async def record_heartbeat(self, snapshot: SnapshotMeta) -> datetime:
+        """Note that the group was checked and still matches `snapshot`.
+
+        Only the group's heartbeat row and the trend rollups are touched, so
+        quiet groups do not add a snapshot per run.
+        """
+        checked_ms = to_epoch_ms(datetime.now(UTC))
+        async with self._write() as db:
+            await db.execute(
+                """
+                INSERT INTO snapshot_heartbeats (group_id, snapshot_id, checked_at, unchanged_runs)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT (group_id) DO UPDATE SET
+                    snapshot_id = excluded.snapshot_id,
+                    checked_at = excluded.checked_at,
+                    unchanged_runs = CASE
+                        WHEN snapshot_id = excluded.snapshot_id THEN unchanged_runs + 1
+                        ELSE 1
+                    END
+                """,
+                (snapshot.group_id, snapshot.id, checked_ms),
+            )
+            await _upsert_rollups(
+                db,
+                snapshot.group_id,
+                snapshot.valid_member_count,
+                checked_ms,
+                {r: _period_start_ms(checked_ms, r) for r in _ROLLUP_TABLES},
+            )
+        return from_epoch_ms(checked_ms)
+
+    async def get_last_snapshot(self, group_id: int) -> SnapshotMeta | None:
+        async with self._read() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT id, collected_at, valid_member_count, max_score, upper_bound, fingerprint
+                FROM score_snapshots
+                WHERE group_id = ?
+                ORDER BY collected_at DESC, id DESC
+                LIMIT 1
+                """,
+                (group_id,),
+            )
+        if not rows:
+            return None
+        snapshot_id, collected_at, count, max_score, upper_bound, fingerprint = rows[0]
+        return SnapshotMeta(
+            id=int(snapshot_id),
+            group_id=group_id,
+            collected_at=from_epoch_ms(collected_at),
+            valid_member_count=int(count),
+            max_score=int(max_score),
+            upper_bound=int(upper_bound),
+            fingerprint=fingerprint,
         )
 
     async def get_last_valid_count(self, group_id: int) -> int | None:
-        async with aiosqlite.connect(self._db_path) as db:
-            cursor = await db.execute(
+        async with self._read() as db:
+            rows = await db.execute_fetchall(
                 """
                 SELECT valid_member_count
                 FROM score_snapshots
                 WHERE group_id = ?
-                ORDER BY id DESC
+                ORDER BY collected_at DESC, id DESC
                 LIMIT 1
                 """,
                 (group_id,),
             )
-            row = await cursor.fetchone()
-            return int(row[0]) if row else None
+        return int(rows[0][0]) if rows else None
+
+    async def get_snapshot_buckets(self, snapshot_id: int) -> list[BucketCount]:
+        async with self._read() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT bucket_start, bucket_width, upper_bound, bucket_counts
+                FROM score_snapshots
+                WHERE id = ?
+                """,
+                (snapshot_id,),
+            )
+        if not rows:
+            return []
+        start, width, upper_bound, blob = rows[0]
+        return _unpack_buckets(start, width, upper_bound, blob)
+
+    async def get_bucket_history(
+        self, group_id: int, window_hours: int
+    ) -> list[tuple[SnapshotMeta, list[BucketCount]]]:
+        since = to_epoch_ms(datetime.now(UTC) - timedelta(hours=window_hours))
+        async with self._read() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT id, collected_at, valid_member_count, max_score, upper_bound,
+                       bucket_start, bucket_width, bucket_counts
+                FROM score_snapshots
+                WHERE group_id = ? AND collected_at >= ?
+                ORDER BY collected_at ASC, id ASC
+                """,
+                (group_id, since),
+            )
+        return [
+            (
+                SnapshotMeta(
+                    id=int(snapshot_id),
+                    group_id=group_id,
+                    collected_at=from_epoch_ms(collected_at),
+                    valid_member_count=int(count),
+                    max_score=int(max_score),
+                    upper_bound=int(upper_bound),
+                ),
+                _unpack_buckets(start, width, upper_bound, blob),
+            )
+            for snapshot_id, collected_at, count, max_score, upper_bound, start, width, blob in rows
+        ]
 
     async def get_trend_points(
         self, group_id: int, window_hours: int
     ) -> list[tuple[datetime, int]]:
-        since = datetime.now(UTC) - timedelta(hours=window_hours)
-        async with aiosqlite.connect(self._db_path) as db:
-            cursor = await db.execute(
+        """Return (time, valid count) points, reading rollups for long windows."""
+        resolution = trend_resolution(window_hours)
+        if resolution != "raw":
+            return [
+                (r.last_at, r.last_count)
+                for r in await self.get_trend_rollups(group_id, window_hours, resolution)
+            ]
+
+        since = to_epoch_ms(datetime.now(UTC) - timedelta(hours=window_hours))
+        async with self._read() as db:
+            rows = await db.execute_fetchall(
                 """
                 SELECT collected_at, valid_member_count
                 FROM score_snapshots
                 WHERE group_id = ? AND collected_at >= ?
-                ORDER BY collected_at ASC
+                ORDER BY collected_at ASC, id ASC
                 """,
-                (group_id, since.isoformat()),
+                (group_id, since),
             )
-            rows = await cursor.fetchall()
-
-        points: list[tuple[datetime, int]] = []
-        for collected_at, count in rows:
-            points.append((datetime.fromisoformat(collected_at), int(count)))
+            heartbeat = await db.execute_fetchall(
+                """
+                SELECT h.checked_at, s.valid_member_count
+                FROM snapshot_heartbeats AS h
+                JOIN score_snapshots AS s ON s.id = h.snapshot_id
+                WHERE h.group_id = ? AND h.checked_at >= ?
+                """,
+                (group_id, since),
+            )
+        points = [(from_epoch_ms(collected_at), count) for collected_at, count in rows]
+        # An unchanged group has no new snapshots; its last check extends the line.
+        for checked_at, count in heartbeat:
+            points.append((from_epoch_ms(checked_at), count))
         return points
 
-    async def cleanup_old(self, retention_days: int) -> None:
-        threshold = datetime.now(UTC) - timedelta(days=retention_days)
-        async with aiosqlite.connect(self._db_path) as db:
-            await db.execute(
-                """
-                DELETE FROM score_buckets
-                WHERE snapshot_id IN (
-                    SELECT id FROM score_snapshots WHERE collected_at < ?
-                )
+    async def get_trend_rollups(
+        self, group_id: int, window_hours: int, resolution: str
+    ) -> list[TrendRollup]:
+        table = _ROLLUP_TABLES[resolution]
+        since = _period_start_ms(
+            to_epoch_ms(datetime.now(UTC) - timedelta(hours=window_hours)), resolution
+        )
+        async with self._read() as db:
+            rows = await db.execute_fetchall(
+                f"""
+                SELECT period_start, min_count, max_count, last_count,
+                       sum_count, sample_count, last_at
+                FROM {table}
+                WHERE group_id = ? AND period_start >= ?
+                ORDER BY period_start ASC
                 """,
-                (threshold.isoformat(),),
+                (group_id, since),
             )
-            await db.execute(
-                "DELETE FROM score_snapshots WHERE collected_at < ?",
-                (threshold.isoformat(),),
+        return [
+            TrendRollup(
+                period_start=from_epoch_ms(period_start),
+                min_count=int(min_count),
+                max_count=int(max_count),
+                last_count=int(last_count),
+                avg_count=int(sum_count) / int(sample_count),
+                last_at=from_epoch_ms(last_at),
             )
+            for period_start, min_count, max_count, last_count, sum_count, sample_count, last_at in rows
+        ]
+
+    async def cleanup_old(self, retention_days: int, chunk_size: int = 500) -> int:
+        """Delete expired rows in short write transactions, yielding between chunks.
+
+        Returns the number of snapshots removed.
+        """
+        threshold = to_epoch_ms(datetime.now(UTC) - timedelta(days=retention_days))
+        removed = 0
+        while True:
+            async with self._write() as db:
+                cursor = await db.execute(
+                    """
+                    DELETE FROM score_snapshots
+                    WHERE id IN (
+                        SELECT id FROM score_snapshots
+                        WHERE collected_at < ?
+                        ORDER BY collected_at
+                        LIMIT ?
+                    )
+                    """,
+                    (threshold, chunk_size),
+                )
+                deleted = cursor.rowcount
+            removed += deleted
+            if deleted < chunk_size:
+                break
+            await asyncio.sleep(0)
+
+        async with self._write() as db:
+            for table in _ROLLUP_TABLES.values():
+                await db.execute(f"DELETE FROM {table} WHERE period_start < ?", (threshold,))
             await db.execute(
-                "DELETE FROM command_usage_logs WHERE created_at < ?",
-                (threshold.isoformat(),),
+                """
+                DELETE FROM snapshot_heartbeats
+                WHERE snapshot_id NOT IN (SELECT id FROM score_snapshots)
+                """
             )
-            await db.commit()
+
+        while True:
+            async with self._write() as db:
+                cursor = await db.execute(
+                    """
+                    DELETE FROM command_usage_logs
+                    WHERE id IN (
+                        SELECT id FROM command_usage_logs
+                        WHERE created_at < ?
+                        ORDER BY created_at
+                        LIMIT ?
+                    )
+                    """,
+                    (threshold, chunk_size),
+                )
+                deleted = cursor.rowcount
+            if deleted < chunk_size:
+                break
+            await asyncio.sleep(0)
+        return removed
 
     async def log_command_usage(
         self,
@@ -157,17 +785,27 @@ class ScoreRepository:
         command: str,
         action: str,
     ) -> None:
-        created_at = datetime.now(UTC).isoformat()
-        async with aiosqlite.connect(self._db_path) as db:
-            await db.execute(
+        await self.log_command_usages(
+            [(group_id, user_id, command, action, datetime.now(UTC))]
+        )
+
+    async def log_command_usages(
+        self, entries: Sequence[tuple[int, int, str, str, datetime]]
+    ) -> None:
+        if not entries:
+            return
+        async with self._write() as db:
+            await db.executemany(
                 """
                 INSERT INTO command_usage_logs (
                     group_id, user_id, command, action, created_at
                 ) VALUES (?, ?, ?, ?, ?)
                 """,
-                (group_id, user_id, command, action, created_at),
+                [
+                    (group_id, user_id, command, action, to_epoch_ms(created_at))
+                    for group_id, user_id, command, action, created_at in entries
+                ],
             )
-            await db.commit()
 
     async def get_command_usage_counts(
         self,
@@ -175,8 +813,8 @@ class ScoreRepository:
         user_id: int,
         action: str = "run",
     ) -> list[tuple[str, int]]:
-        async with aiosqlite.connect(self._db_path) as db:
-            cursor = await db.execute(
+        async with self._read() as db:
+            rows = await db.execute_fetchall(
                 """
                 SELECT command, COUNT(*)
                 FROM command_usage_logs
@@ -186,5 +824,4 @@ class ScoreRepository:
                 """,
                 (group_id, user_id, action),
             )
-            rows = await cursor.fetchall()
         return [(str(command), int(count)) for command, count in rows]
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from itertools import count
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from nonebot.adapters.onebot.v11 import Bot
+
+from qbot.collector import MemberListCache
+
+MEMBER_NOTICE_TYPES = frozenset({"group_card", "group_increase", "group_decrease"})
+
+# Member changes remembered per group for incremental consumers.
+JOURNAL_LIMIT = 1024
+
+# (member before, member after); None on the side where the member is absent.
+MemberChange = tuple[dict[str, Any] | None, dict[str, Any] | None]
+
+
+@dataclass(slots=True)
+class _GroupRoster:
+    members: dict[int, dict[str, Any]] = field(default_factory=dict)
+    version: int = 0
+    snapshot: tuple[dict[str, Any], ...] | None = None
+    # Oldest version the journal can replay from: the last full replace or
+    # the newest entry trimmed off the journal.
+    base_version: int = 0
+    journal: deque[tuple[int, MemberChange]] = field(
+        default_factory=lambda: deque(maxlen=JOURNAL_LIMIT)
+    )
+
+
+class LiveRoster:
+    """Group member lists bootstrapped once and then kept current from notices.
+
+    `group_card`, `group_increase` and `group_decrease` notices are applied
+    incrementally; `resync()` re-downloads the full list to repair drift such
+    as nickname changes, which OneBot does not notify, and is meant to be run
+    periodically by the scheduler. Member dicts are replaced rather than
+    mutated, so snapshots handed out earlier stay intact. Versions come from
+    one counter per instance, so they never repeat even after a group is
+    forgotten and bootstrapped again.
+    """
+
+    def __init__(self, fetch_timeout_seconds: float | None = None) -> None:
+        self._groups: dict[int, _GroupRoster] = {}
+        self._clock = count(1)
+        # TTL 0: no caching, only single-flight coalescing of bootstrap fetches.
+        self._fetcher = MemberListCache(ttl_seconds=0, timeout_seconds=fetch_timeout_seconds)
+        self._fetch_timeout_seconds = fetch_timeout_seconds
+
+    @property
+    def groups(self) -> list[int]:
+        return list(self._groups)
+
+    def is_tracked(self, group_id: int) -> bool:
+        return group_id in self._groups
+
+    def version(self, group_id: int) -> int:
+        roster = self._groups.get(group_id)
+        return roster.version if roster else 0
+
+    async def get(self, bot: Bot, group_id: int) -> Sequence[dict[str, Any]]:
+        roster = self._groups.get(group_id)
+        if roster is None:
+            await self.resync(bot, group_id)
+            roster = self._groups[group_id]
+        if roster.snapshot is None:
+            roster.snapshot = tuple(roster.members.values())
+        return roster.snapshot
+
+    async def resync(self, bot: Bot, group_id: int) -> None:
+        members = await self._fetcher.get(bot, group_id)
+        self._replace(group_id, members)
+
+    def changes_since(self, group_id: int, version: int) -> list[MemberChange] | None:
+        """Member changes after `version`, or None when they are no longer known.
+
+        None means the caller must rebuild from the full list: the group is not
+        tracked, was resynced since, or the journal has been trimmed.
+        """
+        roster = self._groups.get(group_id)
+        if roster is None or version < roster.base_version or version > roster.version:
+            return None
+        if version == roster.version:
+            return []
+        return [change for v, change in roster.journal if v > version]
+
+    def forget(self, group_id: int) -> None:
+        self._groups.pop(group_id, None)
+
+    async def handle_notice(self, bot: Bot, payload: Mapping[str, Any]) -> bool:
+        """Apply one notice payload; returns True when a tracked roster changed."""
+        notice_type = payload.get("notice_type")
+        group_id = payload.get("group_id")
+        user_id = payload.get("user_id")
+        if notice_type not in MEMBER_NOTICE_TYPES:
+            return False
+        if not isinstance(group_id, int) or not isinstance(user_id, int):
+            return False
+        roster = self._groups.get(group_id)
+        if roster is None:
+            return False
+
+        if notice_type == "group_decrease":
+            if user_id == payload.get("self_id"):
+                self.forget(group_id)
+                return True
+            removed = roster.members.pop(user_id, None)
+            if removed is None:
+                return False
+            self._touch(roster, (removed, None))
+            return True
+
+        if notice_type == "group_card":
+            current = roster.members.get(user_id)
+            if current is None:
+                return False
+            updated = {**current, "card": str(payload.get("card_new") or "")}
+            roster.members[user_id] = updated
+            self._touch(roster, (current, updated))
+            return True
+
+        member = await self._fetch_member(bot, group_id, user_id, self._fetch_timeout_seconds)
+        if self._groups.get(group_id) is not roster:
+            return False
+        previous = roster.members.get(user_id)
+        roster.members[user_id] = member
+        self._touch(roster, (previous, member))
+        return True
+
+    def _replace(self, group_id: int, members: Iterable[Mapping[str, Any]]) -> None:
+        by_id: dict[int, dict[str, Any]] = {}
+        for member in members:
+            uid = member.get("user_id")
+            if isinstance(uid, int):
+                by_id[uid] = dict(member)
+        roster = self._groups.setdefault(group_id, _GroupRoster())
+        roster.members = by_id
+        self._touch(roster)
+        roster.base_version = roster.version
+        roster.journal.clear()
+
+    def _touch(self, roster: _GroupRoster, change: MemberChange | None = None) -> None:
+        roster.version = next(self._clock)
+        roster.snapshot = None
+        if change is not None:
+            journal = roster.journal
+            if len(journal) == journal.maxlen:
+                roster.base_version = journal[0][0]
+            journal.append((roster.version, change))
+
+    @staticmethod
+    async def _fetch_member(
+        bot: Bot, group_id: int, user_id: int, timeout: float | None
+    ) -> dict[str, Any]:
+        try:
+            data = await asyncio.wait_for(
+                bot.call_api(
+                    "get_group_member_info", group_id=group_id, user_id=user_id, no_cache=True
+                ),
+                timeout,
+            )
+        except Exception:
+            data = None
+        if isinstance(data, dict):
+            return {**data, "user_id": user_id}
+        # Unknown card for now; the next resync fills it in.
+        return {"user_id": user_id, "card": "", "nickname": ""}
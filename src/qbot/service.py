@@ -1,26 +1,43 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import UTC, datetime
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
 from math import ceil
-from pathlib import Path
+from typing import Any, TypeVar
 
 from qbot.analyzer import summarize
-from qbot.bucketizer import build_buckets
-from qbot.collector import get_group_members
-from qbot.models import BucketCount
-from qbot.parser import parse_member_card
-from qbot.plotter import render_dashboard_chart
-from qbot.ranker import rank_and_percentile
+from nonebot import logger
+
+from qbot.bucketizer import LiveDistribution, ScoreDistribution
+from qbot.chartcache import ChartCache, dashboard_key
+from qbot.collector import MemberJournal, MemberListCache, MemberSource
+from qbot.models import BucketCount, CutoffPolicy, Cutoffs
+from qbot.parser import (
+    ZHERUAN,
+    MemberScores,
+    ProfileClassifier,
+    default_classifier,
+    member_profile_text,
+)
+from qbot.plotter import RENDERERS, ImageBudget
+from qbot.ranker import ScoreIndex, policy_cutoffs, rank_all
+from qbot.renderpool import MANUAL_PRIORITY, RenderPool
 from qbot.repository import ScoreRepository
 
 
 @dataclass(slots=True)
 class StatResult:
     summary_text: str
-    bucket_image: Path | None
-    trend_image: Path | None
+    # Encoded image bytes, shared with the chart cache; do not mutate. PNG,
+    # WebP or JPEG as chosen by the image budget (the smallest encoding when
+    # none fits); a plain PNG when no budget is set.
+    bucket_image: bytes | None
+    trend_image: bytes | None
     buckets: list[BucketCount]
+    # False when the distribution matched the last snapshot and only a
+    # heartbeat was recorded.
+    changed: bool = True
 
 
 @dataclass(slots=True)
@@ -28,8 +45,19 @@ class RankResult:
     text: str
 
 
-RETEST_RANK = 263
-TARGET_RANK = 202
+@dataclass(slots=True)
+class _ScoredGroup:
+    version: int
+    members: Sequence[dict[str, Any]]
+    live: dict[str, LiveDistribution]
+    # Per-member scores; None after incremental updates until the next full scan.
+    scores: dict[str, MemberScores] | None
+    indexes: dict[str, ScoreIndex] = field(default_factory=dict)
+
+
+STANDINGS_CHUNK_SIZE = 100
+
+T = TypeVar("T")
 
 # 2025浙软电子信息复试录取方案：
 # 综合成绩=初试总分/5*70% + 复试成绩*30%
@@ -38,12 +66,6 @@ TARGET_RANK = 202
 WRITTEN_TO_CODING_RATIO = (0.7 / 5) / (0.3 * 0.2)
 
 
-def _avg_top_n(scores_desc: list[int], n: int) -> float | None:
-    if len(scores_desc) < n:
-        return None
-    return sum(scores_desc[:n]) / n
-
-
 def _required_coding_delta_for_written_gap(written_gap: float) -> int:
     if written_gap <= 0:
         return 0
@@ -53,7 +75,8 @@ def _required_coding_delta_for_written_gap(written_gap: float) -> int:
 def _build_comeback_analysis(
     own_score: int,
     target_rank_score: int | None,
-    avg_top_202: float | None,
+    avg_top_target: float | None,
+    target_rank: int = 202,
 ) -> list[str]:
     lines = [
         "=== 复试逆袭分析（按浙软2025口径）===",
@@ -65,33 +88,33 @@ def _build_comeback_analysis(
     ]
 
     if target_rank_score is None:
-        lines.append("第202名分析：样本不足，暂无法估算冲刺空间。")
+        lines.append(f"第{target_rank}名分析：样本不足，暂无法估算冲刺空间。")
     else:
-        gap_to_202 = target_rank_score - own_score
-        if gap_to_202 > 0:
-            need_202 = _required_coding_delta_for_written_gap(gap_to_202)
+        gap_to_target = target_rank_score - own_score
+        if gap_to_target > 0:
+            need_target = _required_coding_delta_for_written_gap(gap_to_target)
             lines.append(
-                f"[202线] 目标初试{target_rank_score}，当前差{gap_to_202}分 -> 机考约+{need_202}分"
+                f"[{target_rank}线] 目标初试{target_rank_score}，当前差{gap_to_target}分 -> 机考约+{need_target}分"
             )
         else:
-            room_202 = _required_coding_delta_for_written_gap(-gap_to_202)
+            room_target = _required_coding_delta_for_written_gap(-gap_to_target)
             lines.append(
-                f"[202线] 初试已不低于{target_rank_score} -> 机考约-{room_202}分仍可追平"
+                f"[{target_rank}线] 初试已不低于{target_rank_score} -> 机考约-{room_target}分仍可追平"
             )
 
-    if avg_top_202 is None:
-        lines.append("前202均分追分：样本不足，暂无法估算。")
+    if avg_top_target is None:
+        lines.append(f"前{target_rank}均分追分：样本不足，暂无法估算。")
     else:
-        gap_to_avg_202 = avg_top_202 - own_score
-        if gap_to_avg_202 > 0:
-            need_avg = _required_coding_delta_for_written_gap(gap_to_avg_202)
+        gap_to_avg = avg_top_target - own_score
+        if gap_to_avg > 0:
+            need_avg = _required_coding_delta_for_written_gap(gap_to_avg)
             lines.append(
-                f"[202均分] 均分{avg_top_202:.2f}，当前差{gap_to_avg_202:.2f}分 -> 机考约+{need_avg}分"
+                f"[{target_rank}均分] 均分{avg_top_target:.2f}，当前差{gap_to_avg:.2f}分 -> 机考约+{need_avg}分"
             )
         else:
-            room_avg = _required_coding_delta_for_written_gap(-gap_to_avg_202)
+            room_avg = _required_coding_delta_for_written_gap(-gap_to_avg)
             lines.append(
-                f"[202均分] 初试已不低于{avg_top_202:.2f} -> 机考约-{room_avg}分仍可追平"
+                f"[{target_rank}均分] 初试已不低于{avg_top_target:.2f} -> 机考约-{room_avg}分仍可追平"
             )
 
     lines.append("----------------------")
@@ -107,90 +130,201 @@ class ScoreStatService:
         history_window_hours: int,
         retention_days: int,
         font_path: str | None,
+        members: MemberSource | None = None,
+        classifier: ProfileClassifier | None = None,
+        cutoff_policy: CutoffPolicy | None = None,
+        group_cutoff_policies: Mapping[int, CutoffPolicy] | None = None,
+        render_pool: RenderPool | None = None,
+        chart_cache: ChartCache | None = None,
+        image_budget: ImageBudget | None = None,
+        renderer: str = "matplotlib",
     ) -> None:
+        if renderer not in RENDERERS:
+            raise ValueError(f"unknown renderer {renderer!r}; expected one of {sorted(RENDERERS)}")
         self.repo = repository
+        self.members = members if members is not None else MemberListCache(ttl_seconds=0)
+        self.classifier = classifier or default_classifier
         self.history_window_hours = history_window_hours
         self.retention_days = retention_days
         self.font_path = font_path
-
-    async def run_once(self, bot, group_id: int) -> StatResult:
-        members = await get_group_members(bot, group_id)
-        parsed = []
-        for m in members:
-            raw = str(m.get("card") or m.get("nickname") or "")
-            item = parse_member_card(raw)
-            if item:
-                parsed.append(item)
-
-        buckets, upper_bound = build_buckets(parsed)
-        prev_valid = await self.repo.get_last_valid_count(group_id)
-
-        if not parsed or upper_bound is None:
-            summary = summarize(
-                [],
-                0,
-                prev_valid,
-                rank_202_score=None,
-                rank_retest_score=None,
-                rank_273_score=None,
-                rank_280_score=None,
-                retest_rank=RETEST_RANK,
-                avg_top_202=None,
-                avg_top_263=None,
-                avg_top_273=None,
-            )
+        self.cutoff_policy = cutoff_policy or CutoffPolicy()
+        self.group_cutoff_policies = dict(group_cutoff_policies or {})
+        self.render_pool = render_pool
+        self.chart_cache = chart_cache or ChartCache()
+        self.image_budget = image_budget
+        self.renderer = renderer
+        # group_id -> (snapshot id, chart key) of the last dashboard sent.
+        self._dashboards: dict[int, tuple[int, str]] = {}
+        self._scored: dict[int, _ScoredGroup] = {}
+
+    def score_index(
+        self,
+        group_id: int,
+        members: Sequence[dict[str, Any]],
+        schema: str = ZHERUAN,
+    ) -> tuple[MemberScores, ScoreIndex]:
+        """Parsed scores and rank index for a member list, built once per roster version."""
+        entry = self._scored_group(group_id, members)
+        if entry.scores is None:
+            entry.scores = self.classifier.scan(members)
+            for name, parsed in entry.scores.items():
+                if not entry.live[name].verify(parsed.scores):
+                    logger.warning("Group {} {} distribution drifted; rebuilt", group_id, name)
+                    entry.live[name] = LiveDistribution.from_scores(parsed.scores)
+                    entry.indexes.pop(name, None)
+        return entry.scores[schema], self._rank_index(entry, schema)
+
+    def rank_index(
+        self,
+        group_id: int,
+        members: Sequence[dict[str, Any]],
+        schema: str = ZHERUAN,
+    ) -> ScoreIndex:
+        """Rank index alone; with a member journal only changed members are parsed."""
+        return self._rank_index(self._scored_group(group_id, members), schema)
+
+    @staticmethod
+    def _rank_index(entry: _ScoredGroup, schema: str) -> ScoreIndex:
+        index = entry.indexes.get(schema)
+        if index is None:
+            index = entry.indexes[schema] = ScoreIndex(entry.live[schema].counts)
+        return index
+
+    def _scored_group(self, group_id: int, members: Sequence[dict[str, Any]]) -> _ScoredGroup:
+        version = self.members.version(group_id)
+        entry = self._scored.get(group_id)
+        if entry is not None and entry.version == version and entry.members is members:
+            return entry
+        if entry is not None and self._apply_changes(group_id, entry, version):
+            entry.members = members
+            return entry
+        scan = self.classifier.scan(members)
+        entry = _ScoredGroup(
+            version=version,
+            members=members,
+            live={name: LiveDistribution.from_scores(p.scores) for name, p in scan.items()},
+            scores=scan,
+        )
+        self._scored[group_id] = entry
+        return entry
+
+    def _apply_changes(self, group_id: int, entry: _ScoredGroup, version: int) -> bool:
+        if not isinstance(self.members, MemberJournal):
+            return False
+        changes = self.members.changes_since(group_id, entry.version)
+        if changes is None:
+            return False
+        classify = self.classifier.classify
+        names = self.classifier.names
+        try:
+            for before, after in changes:
+                old = classify(member_profile_text(before)) if before is not None else None
+                new = classify(member_profile_text(after)) if after is not None else None
+                for i, name in enumerate(names):
+                    entry.live[name].change(
+                        old[i] if old is not None else None,
+                        new[i] if new is not None else None,
+                    )
+        except ValueError:
+            logger.warning("Group {} member deltas did not apply; rebuilding", group_id)
+            return False
+        entry.version = version
+        entry.scores = None
+        entry.indexes.clear()
+        return True
+
+    def cutoff_policy_for(self, group_id: int) -> CutoffPolicy:
+        return self.group_cutoff_policies.get(group_id, self.cutoff_policy)
+
+    async def run_once(self, bot, group_id: int, priority: int = MANUAL_PRIORITY) -> StatResult:
+        members = await self.members.get(bot, group_id)
+        index = self.rank_index(group_id, members)
+        policy = self.cutoff_policy_for(group_id)
+
+        # The index already holds per-score counts; no second pass over members.
+        distribution = ScoreDistribution(index.counts)
+        previous = await self.repo.get_last_snapshot(group_id)
+        prev_valid = previous.valid_member_count if previous is not None else None
+
+        if distribution.max_score is None or distribution.upper_bound is None:
+            summary = summarize(distribution, prev_valid, Cutoffs(), policy)
             return StatResult(summary, None, None, [])
 
-        max_score = max(p.score for p in parsed)
-        snapshot = await self.repo.insert_snapshot(
-            group_id=group_id,
-            valid_member_count=len(parsed),
-            max_score=max_score,
-            upper_bound=upper_bound,
-            buckets=buckets,
-        )
-        await self.repo.cleanup_old(self.retention_days)
+        buckets = distribution.buckets(5)
+        fingerprint = distribution.fingerprint()
+        changed = previous is None or previous.fingerprint != fingerprint
+        if changed:
+            snapshot = await self.repo.insert_snapshot(
+                group_id=group_id,
+                valid_member_count=distribution.total,
+                max_score=distribution.max_score,
+                upper_bound=distribution.upper_bound,
+                buckets=buckets,
+                fingerprint=fingerprint,
+            )
+        else:
+            snapshot = previous
+            await self.repo.record_heartbeat(snapshot)
+
+        summary = summarize(distribution, prev_valid, policy_cutoffs(index, policy), policy)
+
+        # The chart is titled with the snapshot time, so an unchanged group
+        # reuses the one already rendered for that snapshot.
+        image = None
+        last = self._dashboards.get(group_id)
+        if not changed and last is not None and last[0] == snapshot.id:
+            image = self.chart_cache.get(last[1])
+        if image is None:
+            key, image = await self._dashboard_image(
+                group_id, snapshot.collected_at, distribution, priority
+            )
+            self._dashboards[group_id] = (snapshot.id, key)
+        return StatResult(summary, image, None, buckets, changed=changed)
 
-        sorted_scores = sorted((p.score for p in parsed), reverse=True)
-        retest_rank = RETEST_RANK
-        rank_202_score = sorted_scores[201] if len(sorted_scores) >= 202 else None
-        rank_retest_score = (
-            sorted_scores[retest_rank - 1] if len(sorted_scores) >= retest_rank else None
-        )
-        rank_273_score = sorted_scores[272] if len(sorted_scores) >= 273 else None
-        rank_280_score = sorted_scores[279] if len(sorted_scores) >= 280 else None
-        avg_top_202 = _avg_top_n(sorted_scores, 202)
-        avg_top_263 = _avg_top_n(sorted_scores, 263)
-        avg_top_273 = _avg_top_n(sorted_scores, 273)
-
-        summary = summarize(
-            buckets,
-            len(parsed),
-            prev_valid,
-            rank_202_score=rank_202_score,
-            rank_retest_score=rank_retest_score,
-            rank_273_score=rank_273_score,
-            rank_280_score=rank_280_score,
-            retest_rank=retest_rank,
-            avg_top_202=avg_top_202,
-            avg_top_263=avg_top_263,
-            avg_top_273=avg_top_273,
+    async def _dashboard_image(
+        self,
+        group_id: int,
+        collected_at: datetime,
+        distribution: ScoreDistribution,
+        priority: int,
+    ) -> tuple[str, bytes]:
+        trend_points = await self.repo.get_trend_points(group_id, self.history_window_hours)
+        key = dashboard_key(
+            distribution,
+            trend_points,
+            group_id,
+            collected_at,
+            self.history_window_hours,
+            self.font_path,
+            self.image_budget,
+            self.renderer,
         )
+        image = self.chart_cache.get(key)
+        if image is None:
+            encoded = await self._render(
+                RENDERERS[self.renderer],
+                priority,
+                distribution=distribution,
+                points=trend_points,
+                group_id=group_id,
+                collected_at=collected_at,
+                window_hours=self.history_window_hours,
+                font_path=self.font_path,
+                budget=self.image_budget,
+            )
+            logger.debug("Group {} dashboard encoded as {}", group_id, encoded.describe())
+            image = encoded.data
+            self.chart_cache.put(key, image)
+        return key, image
 
-        output_dir = Path("data/charts") / str(group_id)
-        stamp = snapshot.collected_at.strftime("%Y%m%d_%H%M%S")
+    async def _render(self, fn: Callable[..., T], priority: int, **kwargs: Any) -> T:
+        if self.render_pool is None:
+            return fn(**kwargs)
+        return await self.render_pool.render(fn, priority=priority, **kwargs)
 
-        trend_points = await self.repo.get_trend_points(group_id, self.history_window_hours)
-        dashboard_path = render_dashboard_chart(
-            output_path=output_dir / f"dashboard_{stamp}.png",
-            buckets=buckets,
-            points=trend_points,
-            group_id=group_id,
-            collected_at=datetime.now(UTC),
-            window_hours=self.history_window_hours,
-            font_path=self.font_path,
-        )
-        return StatResult(summary, dashboard_path, None, buckets)
+    async def cleanup(self) -> int:
+        self.chart_cache.prune(self.retention_days)
+        return await self.repo.cleanup_old(self.retention_days)
 
     async def query_self_rank(
         self,
@@ -199,26 +333,18 @@ class ScoreStatService:
         user_id: int,
         include_comeback: bool = False,
     ) -> RankResult:
-        members = await get_group_members(bot, group_id)
+        members = await self.members.get(bot, group_id)
+        parsed, index = self.score_index(group_id, members)
 
-        parsed_scores: list[int] = []
-        self_parsed = None
         self_raw = ""
-        self_display_name = ""
-
         for m in members:
-            raw = str(m.get("card") or m.get("nickname") or "")
-            uid = int(m.get("user_id") or 0)
-            parsed = parse_member_card(raw)
-
-            if uid == user_id:
-                self_raw = raw
-                self_parsed = parsed
-                self_display_name = str(m.get("card") or m.get("nickname") or "").strip()
-            if parsed:
-                parsed_scores.append(parsed.score)
-
-        if self_parsed is None:
+            if int(m.get("user_id") or 0) == user_id:
+                self_raw = member_profile_text(m)
+                break
+        own_score = parsed.score_of(user_id)
+        self_display_name = self_raw
+
+        if own_score is None:
             if not self_raw:
                 return RankResult(
                     "你当前名片/昵称为空，无法查询。请改为 `分数-名字` 或 `分数—名字`（例如 `390-张三`）。"
@@ -228,24 +354,18 @@ class ScoreStatService:
                 "请使用 `分数-名字` 或 `分数—名字`，且分数范围 350-500（例如 `390-张三`）。"
             )
 
-        if not parsed_scores:
+        if not index.total:
             return RankResult("当前群里没有可用的有效分数样本。")
 
-        sorted_scores = sorted(parsed_scores, reverse=True)
-        own_score = self_parsed.score
-        valid_count = len(sorted_scores)
-        best_rank, worst_rank, tie_count, percentile = rank_and_percentile(
-            sorted_scores, own_score
-        )
-        target_rank_score = (
-            sorted_scores[TARGET_RANK - 1] if valid_count >= TARGET_RANK else None
-        )
-        avg_top_202 = _avg_top_n(sorted_scores, TARGET_RANK)
+        valid_count = index.total
+        best_rank, worst_rank, tie_count, percentile = index.rank(own_score)
+        policy = self.cutoff_policy_for(group_id)
+        cutoffs = policy_cutoffs(index, policy)
+        target_rank_score = cutoffs.score_at(policy.target_rank)
+        avg_top_target = cutoffs.average_of(policy.target_rank)
 
-        retest_rank = RETEST_RANK
-        retest_score = (
-            sorted_scores[retest_rank - 1] if valid_count >= retest_rank else None
-        )
+        retest_rank = policy.retest_rank
+        retest_score = cutoffs.score_at(retest_rank)
         lines = [
             "=== 个人排名查询 ===",
             f"查询人：{self_display_name or user_id}",
@@ -274,8 +394,40 @@ class ScoreStatService:
                 _build_comeback_analysis(
                     own_score=own_score,
                     target_rank_score=target_rank_score,
-                    avg_top_202=avg_top_202,
+                    avg_top_target=avg_top_target,
+                    target_rank=policy.target_rank,
                 )
             )
 
         return RankResult("\n".join(lines))
+
+    async def query_standings(
+        self, bot, group_id: int, chunk_size: int = STANDINGS_CHUNK_SIZE
+    ) -> list[str]:
+        """Full group leaderboard as text chunks of at most `chunk_size` lines."""
+        members = await self.members.get(bot, group_id)
+        parsed, index = self.score_index(group_id, members)
+        if not index.total:
+            return ["当前群里没有可用的有效分数样本。"]
+
+        names: dict[int, str] = {}
+        for m in members:
+            uid = m.get("user_id")
+            if isinstance(uid, int) and uid not in names:
+                names[uid] = member_profile_text(m)
+
+        retest_rank = self.cutoff_policy_for(group_id).retest_rank
+        retest_score = index.score_at_rank(retest_rank)
+        header = [
+            "=== 全群排名 ===",
+            f"有效样本：{index.total}",
+            f"复试线：第{retest_rank}名分数={retest_score if retest_score is not None else '样本不足'}",
+            "位次 | 分数 | 名片 | 百分位",
+        ]
+        rows = [
+            f"{r.best_rank} | {r.score} | {names.get(r.user_id) or r.user_id} | {r.percentile:.1f}%"
+            for r in rank_all(parsed.user_ids, parsed.scores, index)
+        ]
+        size = max(1, chunk_size)
+        chunks = ["\n".join(rows[i : i + size]) for i in range(0, len(rows), size)]
+        return ["\n".join(header), *chunks]
@@ -1,19 +1,12 @@
 from __future__ import annotations
 
-import re
 from collections.abc import Callable, Sequence
 from typing import Any
 
-from qbot.parser import parse_member_card
+from qbot.parser import ZHEJI, ZHERUAN, default_classifier, member_profile_text
 
-_ZHEJI_PATTERN = re.compile(r"^\s*26\s*[-—]\s*[^-—]+\s*[-—]\s*(\d{3})\s*[-—]\s*.+\s*$")
-
-
-def member_profile_text(member: dict[str, Any]) -> str:
-    card = str(member.get("card") or "").strip()
-    if card:
-        return card
-    return str(member.get("nickname") or "").strip()
+_ZHERUAN_COLUMN = default_classifier.index(ZHERUAN)
+_ZHEJI_COLUMN = default_classifier.index(ZHEJI)
 
 
 def is_zheruan_candidate(profile_text: str) -> bool:
@@ -25,20 +18,11 @@ def is_zheji_candidate(profile_text: str) -> bool:
 
 
 def parse_zheruan_score(profile_text: str) -> int | None:
-    parsed = parse_member_card(profile_text)
-    if parsed is None:
-        return None
-    return parsed.score
+    return default_classifier.classify(profile_text)[_ZHERUAN_COLUMN]
 
 
 def parse_zheji_score(profile_text: str) -> int | None:
-    m = _ZHEJI_PATTERN.match(profile_text.strip())
-    if not m:
-        return None
-    score = int(m.group(1))
-    if score < 350 or score > 500:
-        return None
-    return score
+    return default_classifier.classify(profile_text)[_ZHEJI_COLUMN]
 
 
 def collect_candidates(
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+
+from nonebot import logger
+from nonebot.adapters.onebot.v11 import Bot
+
+
+async def fetch_bot_groups(bot: Bot, timeout: float | None = None) -> set[int] | None:
+    """Group ids the bot account is in, or None when the lookup failed."""
+    try:
+        data = await asyncio.wait_for(bot.call_api("get_group_list"), timeout)
+    except Exception:
+        logger.exception("get_group_list failed for bot {}", bot.self_id)
+        return None
+    if not isinstance(data, list):
+        return None
+    return {g["group_id"] for g in data if isinstance(g, dict) and isinstance(g.get("group_id"), int)}
+
+
+async def fetch_memberships(
+    bots: Mapping[str, Bot], timeout: float | None = None
+) -> dict[str, set[int] | None]:
+    results = await asyncio.gather(*(fetch_bot_groups(bot, timeout) for bot in bots.values()))
+    return dict(zip(bots, results, strict=True))
+
+
+def _eligible(group_id: int, memberships: Mapping[str, set[int] | None]) -> list[str]:
+    # A bot whose group list could not be fetched is still tried; the job fails
+    # over if it turns out not to be a member.
+    return [
+        bot_id
+        for bot_id, groups in memberships.items()
+        if groups is None or group_id in groups
+    ]
+
+
+def assign_groups(
+    groups: Sequence[int], memberships: Mapping[str, set[int] | None]
+) -> dict[int, list[str]]:
+    """Order candidate bots per group, spreading primaries across bots.
+
+    Each group gets every eligible bot, least-loaded first, so the first entry
+    is its primary and the rest are failover candidates. Groups no bot can
+    serve map to an empty list.
+    """
+    load = dict.fromkeys(memberships, 0)
+    plan: dict[int, list[str]] = {}
+    # Place the most constrained groups first so they are not starved.
+    for group_id in sorted(groups, key=lambda g: len(_eligible(g, memberships))):
+        candidates = sorted(_eligible(group_id, memberships), key=lambda b: load[b])
+        if candidates:
+            load[candidates[0]] += 1
+        plan[group_id] = candidates
+    return {group_id: plan[group_id] for group_id in groups}
+
+
+async def run_sharded(
+    groups: Sequence[int],
+    bots: Mapping[str, Bot],
+    memberships: Mapping[str, set[int] | None],
+    job: Callable[[Bot, int], Awaitable[bool]],
+    concurrency_per_bot: int = 2,
+    is_connected: Callable[[str], bool] | None = None,
+) -> dict[int, bool]:
+    """Run `job` for every group on its assigned bot, failing over on error.
+
+    At most `concurrency_per_bot` jobs run on one bot at a time. A job that
+    returns False or raises is retried on the group's next connected
+    candidate bot.
+    """
+    plan = assign_groups(groups, memberships)
+    limits = {bot_id: asyncio.Semaphore(max(1, concurrency_per_bot)) for bot_id in bots}
+    connected = is_connected or (lambda bot_id: True)
+
+    async def _run_group(group_id: int) -> bool:
+        for bot_id in plan[group_id]:
+            if bot_id not in bots or not connected(bot_id):
+                continue
+            async with limits[bot_id]:
+                if not connected(bot_id):
+                    continue
+                try:
+                    if await job(bots[bot_id], group_id):
+                        return True
+                except Exception:
+                    logger.exception("Group {} job failed on bot {}", group_id, bot_id)
+            logger.warning("Group {} job failed on bot {}, trying next bot", group_id, bot_id)
+        return False
+
+    results = await asyncio.gather(*(_run_group(group_id) for group_id in groups))
+    return dict(zip(groups, results, strict=True))
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from datetime import UTC, datetime
+
+from nonebot import logger
+
+from qbot.repository import ScoreRepository
+
+
+class CommandUsageSink:
+    """Buffers command usage rows and writes them in batches off the command path."""
+
+    def __init__(
+        self,
+        repository: ScoreRepository,
+        batch_size: int = 100,
+        flush_interval_seconds: float = 2.0,
+        max_pending: int = 10000,
+    ) -> None:
+        self.repo = repository
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: deque[tuple[int, int, str, str, datetime]] = deque(maxlen=max_pending)
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._closing = False
+        self._dropped = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self._run(), name="qbot-usage-sink")
+
+    def record(self, group_id: int, user_id: int, command: str, action: str) -> None:
+        if len(self._pending) == self._pending.maxlen:
+            self._dropped += 1
+        self._pending.append((group_id, user_id, command, action, datetime.now(UTC)))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            written = 0
+            while self._pending:
+                batch = [
+                    self._pending.popleft()
+                    for _ in range(min(self.batch_size, len(self._pending)))
+                ]
+                try:
+                    await self.repo.log_command_usages(batch)
+                except Exception:
+                    self._pending.extendleft(reversed(batch))
+                    raise
+                written += len(batch)
+            if self._dropped:
+                logger.warning("Command usage sink dropped {} rows on overflow", self._dropped)
+                self._dropped = 0
+            return written
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            self._closing = True
+            self._wakeup.set()
+            await task
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._closing:
+                return
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Command usage flush failed; {} rows kept", self.pending)
@@ -1,21 +1,10 @@
 from qbot.analyzer import summarize
-from qbot.models import BucketCount
+from qbot.bucketizer import build_distribution
+from qbot.models import CutoffPolicy, Cutoffs
 
 
 def test_summarize_no_data() -> None:
-    text = summarize(
-        [],
-        0,
-        None,
-        rank_202_score=None,
-        rank_retest_score=None,
-        rank_273_score=None,
-        rank_280_score=None,
-        retest_rank=263,
-        avg_top_202=None,
-        avg_top_263=None,
-        avg_top_273=None,
-    )
+    text = summarize(build_distribution([]), None, Cutoffs(), CutoffPolicy())
     assert "无有效分数数据" in text
 
 
@@ -24,25 +13,14 @@ def test_summarize_with_delta() -> None:
     测试带有增量变化的分数汇总功能
     验证汇总文本中是否包含所有预期的统计信息
     """
-    # 定义分数段统计桶
-    buckets = [
-        BucketCount(start=350, end=354, count=1),  # 350-354分区间有1人
-        BucketCount(start=355, end=359, count=3),  # 355-359分区间有3人
-        BucketCount(start=360, end=364, count=2),  # 360-364分区间有2人
-    ]
+    # 定义分数分布：350-354分1人，355-359分3人，360-364分2人，共6人
+    distribution = build_distribution([350, 355, 357, 359, 360, 364])
     # 调用summarize函数生成汇总文本
     text = summarize(
-        buckets,
-        valid_count=6,           # 当前有效样本数
+        distribution,
         prev_valid_count=4,      # 上次有效样本数
-        rank_202_score=None,     # 202位次分数
-        rank_retest_score=None,  # 复试分数
-        rank_273_score=None,     # 273位次分数
-        rank_280_score=None,     # 280位次分数
-        retest_rank=263,         # 复试线位次
-        avg_top_202=None,        # 前202名平均分
-        avg_top_263=None,
-        avg_top_273=None,        # 前273名平均分
+        cutoffs=Cutoffs(),       # 各位次分数与均分均样本不足
+        policy=CutoffPolicy(),   # 默认位次：202/263/273/280，复试线第263名
     )
 
     # 验证汇总文本中包含的各个统计信息
@@ -63,25 +41,27 @@ def test_summarize_with_delta() -> None:
 
 
 def test_separator_after_retest_bucket() -> None:
-    buckets = [
-        BucketCount(start=350, end=354, count=10),
-        BucketCount(start=355, end=359, count=12),
-        BucketCount(start=360, end=364, count=19),
-        BucketCount(start=365, end=369, count=22),
-    ]
+    distribution = build_distribution([350] * 10 + [355] * 12 + [360] * 19 + [365] * 22)
     text = summarize(
-        buckets,
-        valid_count=63,
+        distribution,
         prev_valid_count=63,
-        rank_202_score=None,
-        rank_retest_score=362,
-        rank_273_score=None,
-        rank_280_score=None,
-        retest_rank=263,
-        avg_top_202=None,
-        avg_top_263=None,
-        avg_top_273=None,
+        cutoffs=Cutoffs(scores={263: 362}),
+        policy=CutoffPolicy(),
     )
     lines = text.splitlines()
     idx_bucket = lines.index("≥ 360分: 41人 (65.1%)")
     assert lines[idx_bucket + 1] == "-------------------------"
+
+
+def test_summarize_follows_configured_ranks() -> None:
+    policy = CutoffPolicy(ranks=(1, 3), averages=(2,), retest_rank=3, target_rank=1)
+    text = summarize(
+        build_distribution([350, 354, 354]),
+        prev_valid_count=None,
+        cutoffs=Cutoffs(scores={1: 354, 3: 350}, averages={2: 352.0}),
+        policy=policy,
+    )
+    assert "复试线位次：第3名" in text
+    assert "关键位次：第1名=354，第3名=350" in text
+    assert "前2均分：352.00" in text
+    assert "前202均分" not in text
@@ -1,4 +1,11 @@
-from qbot.bucketizer import build_buckets, compute_upper_bound
+import pytest
+
+from qbot.bucketizer import (
+    LiveDistribution,
+    build_buckets,
+    build_distribution,
+    compute_upper_bound,
+)
 from qbot.models import ParsedMember
 
 
@@ -25,3 +32,41 @@ def test_build_buckets_empty() -> None:
     buckets, upper = build_buckets([])
     assert buckets == []
     assert upper is None
+
+
+def test_distribution_widths_and_cumulative() -> None:
+    dist = build_distribution([350, 352, 359, 361, 440, 500])
+
+    assert dist.total == 6
+    assert dist.max_score == 500
+    assert dist.upper_bound == 500
+    assert dist.bins(1).counts[2] == 1
+    assert dist.bins(5).counts[:3].tolist() == [2, 1, 1]
+    assert dist.bins(10).counts[:2].tolist() == [3, 1]
+    assert dist.bins(10).at_least[:2].tolist() == [6, 3]
+    assert dist.buckets(5)[-1].start == 500 and dist.buckets(5)[-1].end == 500
+    assert len(dist.occupied(10)) == 16
+
+
+def test_distribution_matches_buckets() -> None:
+    scores = [351, 352, 377, 377, 440]
+    buckets, upper = build_buckets([_member(s, "x") for s in scores])
+    dist = build_distribution(scores)
+    assert dist.buckets(5) == buckets
+    assert dist.upper_bound == upper
+    assert dist.occupied(5).at_least.tolist()[-1] == 1
+
+
+def test_live_distribution_tracks_deltas() -> None:
+    live = LiveDistribution.from_scores([350, 420, 420])
+    live.change(420, 430)
+    live.change(None, 500)
+    live.change(350, None)
+    live.change(None, None)
+
+    assert live.total == 3
+    assert live.verify([420, 430, 500])
+    assert not live.verify([420, 430])
+    assert live.snapshot().buckets(5) == build_distribution([420, 430, 500]).buckets(5)
+    with pytest.raises(ValueError):
+        live.remove(350)
@@ -0,0 +1,68 @@
+import os
+import time
+from datetime import UTC, datetime, timedelta
+
+from qbot.bucketizer import build_distribution
+from qbot.chartcache import ChartCache, dashboard_key
+
+
+def test_chart_cache_keeps_recent_images_in_memory_and_all_on_disk(tmp_path) -> None:
+    cache = ChartCache(tmp_path, max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+
+    # "b" was least recently used and left memory, but not the disk tier.
+    assert cache.size == 8
+    assert "b" not in cache._entries
+    assert cache.get("b") == b"bbbb"
+    assert cache.get("missing") is None
+
+    reopened = ChartCache(tmp_path)
+    assert reopened.get("c") == b"cccc"
+
+
+def test_chart_cache_prunes_old_files(tmp_path) -> None:
+    cache = ChartCache(tmp_path)
+    cache.put("old", b"x")
+    cache.put("new", b"y")
+    stale = time.time() - 3 * 86400
+    os.utime(tmp_path / "old.bin", (stale, stale))
+
+    assert cache.prune(2) == 1
+    reopened = ChartCache(tmp_path)
+    assert reopened.get("old") is None
+    assert reopened.get("new") == b"y"
+
+
+def test_chart_cache_archive_is_optional_and_capped(tmp_path) -> None:
+    memory_only = ChartCache()
+    memory_only.put("a", b"aaaa")
+    assert memory_only.get("a") == b"aaaa"
+
+    cache = ChartCache(tmp_path, max_disk_bytes=10)
+    cache.put("a", b"aaaa")
+    stale = time.time() - 60
+    os.utime(tmp_path / "a.bin", (stale, stale))
+    cache.put("b", b"bbbb")
+    cache.put("c", b"cccc")
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["b.bin", "c.bin"]
+    assert ChartCache(tmp_path).get("a") is None
+
+
+def test_dashboard_key_changes_with_any_render_input() -> None:
+    at = datetime(2026, 1, 1, tzinfo=UTC)
+    distribution = build_distribution([360, 420, 420])
+    points = [(at, 3)]
+    base = dashboard_key(distribution, points, 1, at, 24, None)
+
+    assert base == dashboard_key(build_distribution([420, 360, 420]), list(points), 1, at, 24, None)
+    assert base != dashboard_key(build_distribution([360, 420]), points, 1, at, 24, None)
+    assert base != dashboard_key(distribution, points + [(at + timedelta(hours=1), 3)], 1, at, 24, None)
+    assert base != dashboard_key(distribution, points, 2, at, 24, None)
+    assert base != dashboard_key(distribution, points, 1, at + timedelta(minutes=1), 24, None)
+    assert base != dashboard_key(distribution, points, 1, at, 48, None)
+    assert base != dashboard_key(distribution, points, 1, at, 24, "font.ttc")
+    assert base != dashboard_key(distribution, points, 1, at, 24, None, renderer="pillow")
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from qbot.collector import MemberListCache
+
+
+class _FakeBot:
+    def __init__(self, delay: float = 0.01) -> None:
+        self.calls = 0
+        self.delay = delay
+
+    async def call_api(self, api: str, **kwargs):
+        assert api == "get_group_member_list"
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [{"user_id": self.calls, "card": "420-张三", "group_id": kwargs["group_id"]}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_share_one_fetch() -> None:
+    bot = _FakeBot()
+    cache = MemberListCache(ttl_seconds=60)
+
+    results = await asyncio.gather(*(cache.get(bot, 1) for _ in range(10)))
+
+    assert bot.calls == 1
+    assert all(r is results[0] for r in results)
+    assert await cache.get(bot, 1) is results[0]
+    assert bot.calls == 1
+    assert cache.version(1) == 1
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry_and_invalidate_refetch() -> None:
+    bot = _FakeBot(delay=0)
+    cache = MemberListCache(ttl_seconds=0)
+    await cache.get(bot, 1)
+    await cache.get(bot, 1)
+    assert bot.calls == 2
+
+    cache = MemberListCache(ttl_seconds=60)
+    await cache.get(bot, 1)
+    cache.invalidate(1)
+    members = await cache.get(bot, 1)
+    assert bot.calls == 4
+    assert members[0]["user_id"] == 4
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_fetch_does_not_cache_stale_list() -> None:
+    bot = _FakeBot(delay=0.02)
+    cache = MemberListCache(ttl_seconds=60)
+    pending = asyncio.create_task(cache.get(bot, 1))
+    await asyncio.sleep(0.005)
+    cache.invalidate(1)
+
+    assert (await pending)[0]["user_id"] == 1
+    assert (await cache.get(bot, 1))[0]["user_id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_errors_are_not_cached() -> None:
+    class _FailingBot(_FakeBot):
+        async def call_api(self, api: str, **kwargs):
+            self.calls += 1
+            raise RuntimeError("napcat down")
+
+    bot = _FailingBot()
+    cache = MemberListCache(ttl_seconds=60)
+    results = await asyncio.gather(cache.get(bot, 1), cache.get(bot, 1), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert bot.calls == 1
+    with pytest.raises(RuntimeError):
+        await cache.get(bot, 1)
+    assert bot.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_hung_fetch_times_out_for_every_waiter() -> None:
+    bot = _FakeBot(delay=5)
+    cache = MemberListCache(ttl_seconds=60, timeout_seconds=0.02)
+
+    results = await asyncio.gather(cache.get(bot, 1), cache.get(bot, 1), return_exceptions=True)
+
+    assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+    assert bot.calls == 1
@@ -1,4 +1,16 @@
-from qbot.parser import parse_member_card
+import re
+
+import pytest
+
+from qbot.parser import (
+    ZHEJI,
+    ZHERUAN,
+    ProfileClassifier,
+    ProfileSchema,
+    build_classifier,
+    default_classifier,
+    parse_member_card,
+)
 
 
 def test_parse_valid_dash() -> None:
@@ -22,3 +34,72 @@ def test_parse_out_of_range() -> None:
 
 def test_parse_invalid_format() -> None:
     assert parse_member_card("420 张三") is None
+
+
+def test_classifier_scan_memoizes_repeated_cards() -> None:
+    members = [
+        {"user_id": 1, "card": "420-张三"},
+        {"user_id": 2, "card": "", "nickname": "390—李四"},
+        {"user_id": 3, "card": "bad"},
+        {"user_id": 4, "card": "420-张三"},
+    ]
+    classifier = ProfileClassifier()
+
+    batch = classifier.scan(members)[ZHERUAN]
+
+    assert list(batch.user_ids) == [1, 2, 4]
+    assert list(batch.scores) == [420, 390, 420]
+    assert batch.score_of(2) == 390
+    assert batch.score_of(3) is None
+    assert classifier.classify.cache_info().hits == 1
+
+    classifier.scan(members)
+    assert classifier.classify.cache_info().misses == 3
+
+
+def test_classifier_reports_every_schema_per_profile() -> None:
+    classifier = build_classifier({"zhedian": r"^\s*26-电子-(?P<score>\d{3})-.+$"})
+    assert classifier.names == (ZHERUAN, ZHEJI, "zhedian")
+
+    assert classifier.classify("420-张三") == (420, None, None)
+    assert classifier.classify("26-计科-405-李四") == (None, 405, None)
+    assert classifier.classify("26-电子-390-王五") == (None, 390, 390)
+    assert classifier.classify("26-计科-320-赵六") == (None, None, None)
+    # Misses share one tuple instead of allocating per call.
+    assert classifier.classify("bad") is classifier.classify("")
+
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["400- ", "400-", " 400 - \t", "", "   ", " 26-计科-400- ", "26-计科-400-", "26-计科-400 —  "],
+)
+def test_classifier_rejects_blank_names_like_parse_member_card(text: str) -> None:
+    classifier = ProfileClassifier()
+    assert parse_member_card(text) is None
+    assert classifier.classify(text) == (None, None)
+
+
+def test_classifier_ignores_surrounding_blanks() -> None:
+    classifier = ProfileClassifier()
+    assert classifier.classify(" 420-张三 ") == (420, None)
+    assert classifier.classify(" 26-计科-405-李四\t") == (None, 405)
+    assert parse_member_card(" 420-张三 ").score == 420
+
+def test_classifier_scan_splits_scores_by_schema() -> None:
+    members = [
+        {"user_id": 1, "card": "420-张三"},
+        {"user_id": 2, "card": " ", "nickname": "26-计科-405-李四"},
+        {"user_id": 3, "card": "bad"},
+    ]
+    result = default_classifier.scan(members)
+    assert list(result[ZHERUAN].user_ids) == [1]
+    assert list(result[ZHEJI].scores) == [405]
+    assert result[ZHEJI].score_of(2) == 405
+
+
+def test_classifier_rejects_bad_schemas() -> None:
+    with pytest.raises(ValueError):
+        ProfileClassifier([ProfileSchema("x", re.compile(r"^(\d+)$"))])
+    with pytest.raises(ValueError):
+        build_classifier({ZHERUAN: r"^(?P<score>\d+)$"})
@@ -0,0 +1,92 @@
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import matplotlib
+import pytest
+
+from qbot import plotter
+from qbot.bucketizer import build_distribution
+
+
+@pytest.mark.filterwarnings("ignore:Glyph", "ignore:This figure includes Axes")
+def test_dashboard_template_reuse_matches_fresh_render() -> None:
+    at = datetime(2026, 1, 1, tzinfo=UTC)
+    first = build_distribution([352, 371, 371, 408, 455, 468])
+    second = build_distribution([350, 366, 401, 402, 433, 433, 433, 467])
+    points = [(at + timedelta(hours=h), 5 + h % 3) for h in range(6)]
+
+    plotter.clear_templates()
+    plotter.render_dashboard_chart(first, points, 1, at, 24, None)
+    reused = plotter.render_dashboard_chart(second, points[1:], 2, at, 12, None)
+    assert len(plotter._templates) == 1
+
+    plotter.clear_templates()
+    fresh = plotter.render_dashboard_chart(second, points[1:], 2, at, 12, None)
+
+    assert reused.data.startswith(b"\x89PNG")
+    assert reused == fresh
+    plotter.clear_templates()
+
+
+def test_font_is_registered_once_per_path(monkeypatch) -> None:
+    from matplotlib import font_manager
+
+    font_path = str(Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf")
+    added: list[str] = []
+    addfont = font_manager.fontManager.addfont
+    monkeypatch.setattr(
+        font_manager.fontManager, "addfont", lambda path: (added.append(path), addfont(path))
+    )
+    plotter._register_font.cache_clear()
+
+    with matplotlib.rc_context():
+        plotter._apply_font(font_path)
+        plotter._apply_font(font_path)
+        assert matplotlib.rcParams["font.sans-serif"] == ["DejaVu Sans"]
+    assert added == [font_path]
+
+
+@pytest.mark.filterwarnings("ignore:Glyph", "ignore:This figure includes Axes")
+def test_image_budget_picks_first_encoding_within_target() -> None:
+    at = datetime(2026, 1, 1, tzinfo=UTC)
+    distribution = build_distribution([350 + i % 120 for i in range(400)])
+    points = [(at + timedelta(hours=h), 400 + h) for h in range(12)]
+    plotter.clear_templates()
+
+    plain = plotter.render_dashboard_chart(distribution, points, 1, at, 24, None)
+    palette = plotter.render_dashboard_chart(
+        distribution, points, 1, at, 24, None, budget=plotter.ImageBudget(max_bytes=len(plain.data))
+    )
+    assert (palette.format, palette.dpi) == ("png8", 150)
+    assert palette.data.startswith(b"\x89PNG")
+    assert len(palette.data) < len(plain.data) // 2
+
+    tight = plotter.ImageBudget(max_bytes=1, formats=("png8", "jpeg"), dpis=(150, 100))
+    smallest = plotter.render_dashboard_chart(distribution, points, 1, at, 24, None, budget=tight)
+    assert smallest.dpi == 100
+    assert len(smallest.data) < len(palette.data)
+    plotter.clear_templates()
+
+
+def test_image_budget_rejects_unknown_formats() -> None:
+    with pytest.raises(ValueError):
+        plotter.ImageBudget(formats=("gif",))
+
+
+def test_fast_renderer_draws_without_matplotlib_figures() -> None:
+    at = datetime(2026, 1, 1, tzinfo=UTC)
+    distribution = build_distribution([350 + i % 120 for i in range(400)])
+    points = [(at + timedelta(hours=h), 400 + h) for h in range(12)]
+    plotter.clear_templates()
+
+    fast = plotter.RENDERERS["pillow"](distribution, points, 1, at, 24, None)
+    assert (fast.format, fast.dpi) == ("png8", plotter.FAST_DPI)
+    assert fast.data.startswith(b"\x89PNG")
+    assert not plotter._templates
+
+    empty = plotter.render_fast_dashboard(build_distribution([]), [], 1, at, 24, None)
+    assert empty.data.startswith(b"\x89PNG")
+
+    tight = plotter.ImageBudget(max_bytes=1, formats=("png8", "jpeg"), dpis=(150, 100))
+    smallest = plotter.render_fast_dashboard(distribution, points, 1, at, 24, None, budget=tight)
+    assert smallest.dpi == 100
@@ -0,0 +1,160 @@
+import asyncio
+from types import SimpleNamespace
+
+import nonebot
+import pytest
+from nonebot.adapters.onebot.v11 import Adapter
+from nonebot.exception import FinishedException
+
+from qbot.collector import MemberListCache
+from qbot.roster import LiveRoster
+from qbot.service import ScoreStatService
+
+
+@pytest.fixture(scope="module")
+def plugin():
+    nonebot.init()
+    nonebot.get_driver().register_adapter(Adapter)
+    return nonebot.load_plugin("qbot.plugin").module
+
+
+class _FakeBot:
+    def __init__(self, self_id: str, groups: set[int], members: dict[int, list[dict]] | None = None) -> None:
+        self.self_id = self_id
+        self.groups = groups
+        self.members = members or {}
+        self.sent: list[tuple[int, object]] = []
+        self.calls: list[tuple[str, dict]] = []
+        self.hanging: set[int] = set()
+
+    async def call_api(self, api: str, **kwargs):
+        self.calls.append((api, kwargs))
+        if api == "get_group_list":
+            return [{"group_id": group_id} for group_id in sorted(self.groups)]
+        if api == "get_group_member_list":
+            group_id = kwargs["group_id"]
+            if group_id in self.hanging:
+                await asyncio.sleep(10)
+            if group_id not in self.groups:
+                raise RuntimeError("not a member")
+            return self.members.get(group_id, [])
+        raise AssertionError(f"unexpected api {api}")
+
+    async def send_group_msg(self, group_id: int, message) -> None:
+        self.sent.append((group_id, message))
+
+
+class _FakeMatcher:
+    def __init__(self) -> None:
+        self.replies: list[str] = []
+
+    async def finish(self, text: str) -> None:
+        self.replies.append(text)
+        raise FinishedException
+
+
+async def _reply(command, *args) -> str:
+    matcher = _FakeMatcher()
+    with pytest.raises(FinishedException):
+        await command(*args, matcher)
+    assert len(matcher.replies) == 1
+    return matcher.replies[0]
+
+
+def _connect(monkeypatch, plugin, bots: dict[str, _FakeBot]) -> None:
+    monkeypatch.setattr(plugin, "get_driver", lambda: SimpleNamespace(bots=bots))
+
+
+@pytest.mark.asyncio
+async def test_roster_resync_uses_a_bot_in_each_group(plugin, monkeypatch) -> None:
+    a = _FakeBot("a", {1}, {1: [{"user_id": 10, "card": "420-甲"}]})
+    b = _FakeBot("b", {2}, {2: [{"user_id": 20, "card": "410-乙"}]})
+    bots = {"a": a, "b": b}
+    _connect(monkeypatch, plugin, bots)
+    live = LiveRoster()
+    await live.get(a, 1)
+    await live.get(b, 2)
+    a.members[1].append({"user_id": 11, "card": "400-丙"})
+    b.members[2].append({"user_id": 21, "card": "390-丁"})
+
+    assert await plugin._resync_rosters(live, bots) == []
+    assert {m["user_id"] for m in await live.get(a, 1)} == {10, 11}
+    assert {m["user_id"] for m in await live.get(b, 2)} == {20, 21}
+    assert not any(kw.get("group_id") == 2 for api, kw in a.calls if api == "get_group_member_list")
+
+
+LOCAL = 1
+ZHEJI = 2
+LOCAL_MEMBERS = [
+    {"user_id": 10, "card": "420-甲"},
+    {"user_id": 11, "card": "400-乙"},
+    {"user_id": 12, "card": "随便"},
+]
+ZHEJI_MEMBERS = [
+    {"user_id": 20, "card": "26-计科-430-丙"},
+    {"user_id": 10, "card": "26-软工-420-甲"},
+]
+
+
+@pytest.fixture
+def cross_group(plugin, monkeypatch):
+    """A bot in both groups whose member lists go through a 50 ms timeout."""
+    cache = MemberListCache(ttl_seconds=0, timeout_seconds=0.05)
+    service = ScoreStatService(plugin.repo, 24, 30, None, members=cache)
+    monkeypatch.setattr(plugin, "members", cache)
+    monkeypatch.setattr(plugin, "service", service)
+    monkeypatch.setattr(plugin.settings, "zheji_group_id", ZHEJI)
+    return _FakeBot("a", {LOCAL, ZHEJI}, {LOCAL: LOCAL_MEMBERS, ZHEJI: ZHEJI_MEMBERS})
+
+
+@pytest.mark.asyncio
+async def test_set_overlap_reports_the_group_that_timed_out(plugin, cross_group) -> None:
+    cross_group.hanging.add(ZHEJI)
+
+    text = await _reply(plugin._run_set_overlap_check, cross_group, LOCAL)
+
+    assert "浙软考生数：2" in text
+    assert "浙计名单查询失败" in text
+
+
+@pytest.mark.asyncio
+async def test_set_overlap_reports_the_group_that_raised(plugin, cross_group) -> None:
+    cross_group.groups.discard(LOCAL)
+
+    text = await _reply(plugin._run_set_overlap_check, cross_group, LOCAL)
+
+    assert "浙计考生数：2" in text
+    assert "浙软名单查询失败" in text
+
+
+@pytest.mark.asyncio
+async def test_set_overlap_fails_only_when_both_groups_fail(plugin, cross_group) -> None:
+    cross_group.groups.discard(LOCAL)
+    cross_group.hanging.add(ZHEJI)
+
+    assert await _reply(plugin._run_set_overlap_check, cross_group, LOCAL) == (
+        "名单查询失败，请检查 OneBot 接口和群可见性。"
+    )
+
+
+@pytest.mark.asyncio
+async def test_rank_comp_answers_local_rank_when_zheji_times_out(plugin, cross_group) -> None:
+    cross_group.hanging.add(ZHEJI)
+
+    text = await _reply(plugin._run_rank_comp, cross_group, LOCAL, 11)
+
+    assert "浙软 | 400 | 2/2(同分1) | 100.0%" in text
+    assert "浙计 | - | 查询失败（超时或接口异常） | -" in text
+
+    cross_group.hanging.clear()
+    text = await _reply(plugin._run_rank_comp, cross_group, LOCAL, 11)
+    assert text.splitlines()[-2].startswith("浙计 | 400* | ")
+
+
+@pytest.mark.asyncio
+async def test_rank_comp_needs_the_local_group(plugin, cross_group) -> None:
+    cross_group.groups.discard(LOCAL)
+
+    assert await _reply(plugin._run_rank_comp, cross_group, LOCAL, 11) == (
+        "查询失败：无法拉取群成员列表，请检查 OneBot 接口。"
+    )
@@ -0,0 +1,44 @@
+import asyncio
+import time
+from datetime import UTC, datetime
+
+import pytest
+
+from qbot.bucketizer import build_distribution
+from qbot.plotter import render_dashboard_chart
+from qbot.renderpool import MANUAL_PRIORITY, SCHEDULED_PRIORITY, RenderPool
+
+
+@pytest.mark.asyncio
+async def test_render_pool_runs_charts_and_prioritizes_manual_jobs() -> None:
+    pool = RenderPool(workers=1)
+    pool.start()
+    try:
+        await pool.warm_up()
+        image = await pool.render(
+            render_dashboard_chart,
+            distribution=build_distribution([350, 360, 420]),
+            points=[(datetime(2026, 1, 1, tzinfo=UTC), 3)],
+            group_id=1,
+            collected_at=datetime(2026, 1, 1, tzinfo=UTC),
+            window_hours=24,
+            font_path=None,
+        )
+        assert image.data.startswith(b"\x89PNG")
+
+        finished: list[str] = []
+
+        async def _job(name: str, priority: int) -> None:
+            await pool.render(time.sleep, 0.05, priority=priority)
+            finished.append(name)
+
+        busy = asyncio.create_task(pool.render(time.sleep, 0.3))
+        await asyncio.sleep(0.05)
+        jobs = [
+            asyncio.create_task(_job("scheduled", SCHEDULED_PRIORITY)),
+            asyncio.create_task(_job("manual", MANUAL_PRIORITY)),
+        ]
+        await asyncio.gather(busy, *jobs)
+        assert finished == ["manual", "scheduled"]
+    finally:
+        await pool.close()
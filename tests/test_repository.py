@@ -0,0 +1,207 @@
+import asyncio
+import sqlite3
+from datetime import UTC, datetime
+
+import pytest
+import pytest_asyncio
+
+from qbot.models import BucketCount
+from qbot.repository import ScoreRepository, trend_resolution
+
+
+@pytest_asyncio.fixture
+async def repo(tmp_path):
+    repository = ScoreRepository(tmp_path / "qbot.sqlite3", reader_pool_size=2)
+    await repository.init()
+    yield repository
+    await repository.close()
+
+
+@pytest.mark.asyncio
+async def test_repository_uses_wal_and_long_lived_connections(repo: ScoreRepository) -> None:
+    await repo.init()
+
+    async with repo._read() as db:
+        rows = await db.execute_fetchall("PRAGMA journal_mode")
+    assert rows[0][0] == "wal"
+
+    writer = repo._writer
+    await repo.insert_snapshot(1, 3, 420, 425, [BucketCount(350, 354, 3)])
+    assert repo._writer is writer
+
+
+@pytest.mark.asyncio
+async def test_reads_run_concurrently_with_snapshot_writes(repo: ScoreRepository) -> None:
+    await repo.insert_snapshot(1, 3, 420, 425, [BucketCount(350, 354, 3)])
+
+    results = await asyncio.gather(
+        repo.insert_snapshot(1, 5, 430, 435, [BucketCount(350, 354, 5)]),
+        repo.get_last_valid_count(1),
+        repo.get_trend_points(1, 24),
+        repo.get_last_valid_count(2),
+    )
+    assert results[1] in {3, 5}
+    assert results[3] is None
+    assert await repo.get_last_valid_count(1) == 5
+    assert [count for _, count in await repo.get_trend_points(1, 24)] == [3, 5]
+
+
+@pytest.mark.asyncio
+async def test_repository_requires_init(tmp_path) -> None:
+    repo = ScoreRepository(tmp_path / "qbot.sqlite3")
+    with pytest.raises(RuntimeError):
+        await repo.get_last_valid_count(1)
+
+
+@pytest.mark.asyncio
+async def test_cleanup_old_deletes_in_chunks(repo: ScoreRepository) -> None:
+    for count in range(5):
+        await repo.insert_snapshot(1, count, 420, 425, [BucketCount(350, 354, count)])
+    await repo.log_command_usage(1, 2, "rank", "run")
+    async with repo._write() as db:
+        await db.execute(
+            "UPDATE score_snapshots SET collected_at = 946684800000 WHERE id <= 3"
+        )
+        await db.execute("UPDATE command_usage_logs SET created_at = 946684800000")
+
+    removed = await repo.cleanup_old(retention_days=30, chunk_size=2)
+
+    assert removed == 3
+    assert [count for _, count in await repo.get_trend_points(1, 24)] == [3, 4]
+    async with repo._read() as db:
+        logs = await db.execute_fetchall("SELECT COUNT(*) FROM command_usage_logs")
+    assert logs[0][0] == 0
+
+
+@pytest.mark.asyncio
+async def test_snapshot_buckets_round_trip_through_blob(repo: ScoreRepository) -> None:
+    buckets = [BucketCount(350, 354, 2), BucketCount(355, 359, 0), BucketCount(360, 362, 7)]
+    snapshot = await repo.insert_snapshot(1, 9, 361, 362, buckets)
+
+    assert await repo.get_snapshot_buckets(snapshot.id) == buckets
+    history = await repo.get_bucket_history(1, 24)
+    assert [(meta.id, items) for meta, items in history] == [(snapshot.id, buckets)]
+
+
+@pytest.mark.asyncio
+async def test_migrates_bucket_rows_into_packed_blob(tmp_path) -> None:
+    db_path = tmp_path / "qbot.sqlite3"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE score_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                group_id INTEGER NOT NULL,
+                collected_at TEXT NOT NULL,
+                valid_member_count INTEGER NOT NULL,
+                max_score INTEGER NOT NULL,
+                upper_bound INTEGER NOT NULL
+            );
+            CREATE TABLE score_buckets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                bucket_end INTEGER NOT NULL,
+                count INTEGER NOT NULL
+            );
+            INSERT INTO score_snapshots VALUES (1, 1, '2099-01-01T00:00:00+00:00', 4, 362, 367);
+            INSERT INTO score_buckets (snapshot_id, bucket_start, bucket_end, count)
+            VALUES (1, 350, 354, 1), (1, 355, 359, 0), (1, 360, 364, 3), (1, 365, 367, 0);
+            """
+        )
+
+    repo = ScoreRepository(db_path)
+    await repo.init()
+    try:
+        await _assert_migrated_legacy_snapshot(repo)
+    finally:
+        await repo.close()
+
+
+async def _assert_migrated_legacy_snapshot(repo: ScoreRepository) -> None:
+    assert await repo.get_snapshot_buckets(1) == [
+        BucketCount(350, 354, 1),
+        BucketCount(355, 359, 0),
+        BucketCount(360, 364, 3),
+        BucketCount(365, 367, 0),
+    ]
+    async with repo._read() as db:
+        tables = await db.execute_fetchall("SELECT name FROM sqlite_master WHERE type = 'table'")
+    assert "score_buckets" not in {row[0] for row in tables}
+    history = await repo.get_bucket_history(1, 24 * 365 * 100)
+    assert history[0][0].collected_at == datetime(2099, 1, 1, tzinfo=UTC)
+    assert (await repo.get_trend_rollups(1, 24 * 365 * 100, "day"))[0].last_count == 4
+
+
+@pytest.mark.asyncio
+async def test_snapshot_queries_use_covering_index(repo: ScoreRepository) -> None:
+    async with repo._read() as db:
+        rows = await db.execute_fetchall("SELECT typeof(collected_at) FROM score_snapshots")
+        last_plan = await db.execute_fetchall(
+            """
+            EXPLAIN QUERY PLAN
+            SELECT valid_member_count FROM score_snapshots
+            WHERE group_id = 1 ORDER BY collected_at DESC LIMIT 1
+            """
+        )
+        trend_plan = await db.execute_fetchall(
+            """
+            EXPLAIN QUERY PLAN
+            SELECT collected_at, valid_member_count FROM score_snapshots
+            WHERE group_id = 1 AND collected_at >= 0 ORDER BY collected_at ASC
+            """
+        )
+    assert rows == []
+    for plan in (last_plan, trend_plan):
+        assert any("COVERING INDEX idx_snapshots_group_time_count" in row[-1] for row in plan)
+    await repo.insert_snapshot(1, 3, 420, 425, [BucketCount(350, 354, 3)])
+    async with repo._read() as db:
+        rows = await db.execute_fetchall("SELECT typeof(collected_at) FROM score_snapshots")
+    assert rows == [("integer",)]
+
+
+@pytest.mark.asyncio
+async def test_rollups_track_min_max_last_and_average(repo: ScoreRepository) -> None:
+    for count in (5, 9, 7):
+        await repo.insert_snapshot(1, count, 420, 425, [BucketCount(350, 354, count)])
+
+    hourly = await repo.get_trend_rollups(1, 24 * 7, "hour")
+    assert hourly[-1].last_count == 7
+    day = (await repo.get_trend_rollups(1, 24 * 30, "day"))[-1]
+    assert (day.min_count, day.max_count, day.last_count, day.avg_count) == (5, 9, 7, 7.0)
+
+    long_points = await repo.get_trend_points(1, 24 * 30)
+    assert long_points[-1][1] == 7
+    assert len(long_points) == 1
+    assert [c for _, c in await repo.get_trend_points(1, 24)] == [5, 9, 7]
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_replaces_unchanged_snapshots(repo: ScoreRepository) -> None:
+    first = await repo.insert_snapshot(1, 3, 420, 425, [BucketCount(350, 354, 3)], b"fp")
+    last = await repo.get_last_snapshot(1)
+    assert last is not None and last.id == first.id and last.fingerprint == b"fp"
+
+    await repo.record_heartbeat(last)
+    await repo.record_heartbeat(last)
+
+    async with repo._read() as db:
+        snapshots = await db.execute_fetchall("SELECT COUNT(*) FROM score_snapshots")
+        heartbeats = await db.execute_fetchall(
+            "SELECT snapshot_id, unchanged_runs FROM snapshot_heartbeats"
+        )
+    assert snapshots[0][0] == 1
+    assert heartbeats == [(first.id, 2)]
+    points = await repo.get_trend_points(1, 24)
+    assert [count for _, count in points] == [3, 3]
+
+    await repo.insert_snapshot(1, 4, 420, 425, [BucketCount(350, 354, 4)], b"fp2")
+    async with repo._read() as db:
+        heartbeats = await db.execute_fetchall("SELECT COUNT(*) FROM snapshot_heartbeats")
+    assert heartbeats[0][0] == 0
+
+
+def test_trend_resolution_by_window() -> None:
+    assert trend_resolution(24) == "raw"
+    assert trend_resolution(24 * 7) == "hour"
+    assert trend_resolution(24 * 30) == "day"
@@ -17,6 +17,7 @@ async def test_command_usage_counts(tmp_path) -> None:
 
     run_counts = await repo.get_command_usage_counts(group_id, user_id, action="run")
     help_counts = await repo.get_command_usage_counts(group_id, user_id, action="help")
+    await repo.close()
 
     assert run_counts == [("rank", 2), ("set", 1)]
     assert help_counts == [("rank", 1)]
@@ -0,0 +1,89 @@
+import pytest
+
+from qbot.roster import LiveRoster
+
+
+class _FakeBot:
+    def __init__(self, members: list[dict]) -> None:
+        self.members = members
+        self.calls: list[str] = []
+
+    async def call_api(self, api: str, **kwargs):
+        self.calls.append(api)
+        if api == "get_group_member_list":
+            return [dict(m) for m in self.members]
+        if api == "get_group_member_info":
+            return {"user_id": kwargs["user_id"], "card": "401-新人", "nickname": "n"}
+        raise AssertionError(api)
+
+
+def _cards(members) -> dict[int, str]:
+    return {m["user_id"]: m["card"] for m in members}
+
+
+@pytest.mark.asyncio
+async def test_roster_applies_notices_without_refetching() -> None:
+    bot = _FakeBot([{"user_id": 1, "card": "420-甲"}, {"user_id": 2, "card": "390-乙"}])
+    roster = LiveRoster()
+
+    first = await roster.get(bot, 100)
+    assert _cards(first) == {1: "420-甲", 2: "390-乙"}
+    version = roster.version(100)
+
+    await roster.handle_notice(
+        bot, {"notice_type": "group_card", "group_id": 100, "user_id": 1, "card_new": "425-甲"}
+    )
+    await roster.handle_notice(bot, {"notice_type": "group_decrease", "group_id": 100, "user_id": 2})
+    await roster.handle_notice(bot, {"notice_type": "group_increase", "group_id": 100, "user_id": 3})
+
+    current = await roster.get(bot, 100)
+    assert _cards(current) == {1: "425-甲", 3: "401-新人"}
+    assert _cards(first) == {1: "420-甲", 2: "390-乙"}
+    assert roster.version(100) == version + 3
+    assert bot.calls == ["get_group_member_list", "get_group_member_info"]
+
+
+@pytest.mark.asyncio
+async def test_roster_ignores_untracked_groups_and_resyncs_drift() -> None:
+    bot = _FakeBot([{"user_id": 1, "card": "", "nickname": "400-甲"}])
+    roster = LiveRoster()
+    changed = await roster.handle_notice(
+        bot, {"notice_type": "group_card", "group_id": 100, "user_id": 1, "card_new": "x"}
+    )
+    assert not changed
+    assert not roster.is_tracked(100)
+
+    await roster.get(bot, 100)
+    bot.members = [{"user_id": 1, "card": "", "nickname": "405-甲"}]
+    await roster.resync(bot, 100)
+    assert (await roster.get(bot, 100))[0]["nickname"] == "405-甲"
+
+    await roster.handle_notice(
+        bot, {"notice_type": "group_decrease", "group_id": 100, "user_id": 9, "self_id": 9}
+    )
+    assert not roster.is_tracked(100)
+
+
+@pytest.mark.asyncio
+async def test_roster_journal_replays_changes_until_resync() -> None:
+    bot = _FakeBot([{"user_id": 1, "card": "420-甲"}, {"user_id": 2, "card": "390-乙"}])
+    roster = LiveRoster()
+    await roster.get(bot, 100)
+    start = roster.version(100)
+    assert roster.changes_since(100, start) == []
+
+    await roster.handle_notice(
+        bot, {"notice_type": "group_card", "group_id": 100, "user_id": 1, "card_new": "425-甲"}
+    )
+    await roster.handle_notice(bot, {"notice_type": "group_decrease", "group_id": 100, "user_id": 2})
+
+    changes = roster.changes_since(100, start)
+    assert changes is not None
+    assert [(b and b["card"], a and a["card"]) for b, a in changes] == [
+        ("420-甲", "425-甲"),
+        ("390-乙", None),
+    ]
+
+    await roster.resync(bot, 100)
+    assert roster.changes_since(100, start) is None
+    assert roster.changes_since(200, 0) is None
@@ -1,5 +1,12 @@
-from qbot.ranker import rank_and_percentile
-from qbot.service import _build_comeback_analysis, _required_coding_delta_for_written_gap
+import pytest
+
+from qbot.ranker import ScoreIndex, compute_cutoffs, rank_all, rank_and_percentile
+from qbot.roster import LiveRoster
+from qbot.service import (
+    ScoreStatService,
+    _build_comeback_analysis,
+    _required_coding_delta_for_written_gap,
+)
 
 
 def test_rank_and_percentile_basic() -> None:
@@ -20,6 +27,43 @@ def test_rank_and_percentile_top() -> None:
     assert round(percentile, 1) == 33.3
 
 
+def test_score_index_matches_sorted_list() -> None:
+    scores = [420, 410, 410, 390, 380, 500, 350]
+    index = ScoreIndex.from_scores(scores)
+    sorted_scores = sorted(scores, reverse=True)
+
+    assert index.total == len(scores)
+    for own in set(scores):
+        assert index.rank(own) == rank_and_percentile(sorted_scores, own)
+    assert [index.score_at_rank(k) for k in range(1, 8)] == sorted_scores
+    assert index.score_at_rank(0) is None
+    assert index.score_at_rank(8) is None
+    assert index.avg_top(3) == (500 + 420 + 410) / 3
+    assert index.avg_top(8) is None
+
+
+def test_rank_all_matches_single_queries() -> None:
+    user_ids = [1, 2, 3, 4, 5]
+    scores = [390, 420, 410, 410, 380]
+    ranked = rank_all(user_ids, scores)
+    sorted_scores = sorted(scores, reverse=True)
+
+    assert [r.user_id for r in ranked] == [2, 3, 4, 1, 5]
+    for r in ranked:
+        assert (r.best_rank, r.worst_rank, r.tie_count, r.percentile) == rank_and_percentile(
+            sorted_scores, r.score
+        )
+
+
+def test_compute_cutoffs_in_one_pass() -> None:
+    scores = [420, 410, 410, 390, 380, 500, 350]
+    index = ScoreIndex.from_scores(scores)
+    cutoffs = compute_cutoffs(index, ranks=(7, 1, 3, 8), averages=(2, 7, 9))
+
+    assert cutoffs.scores == {7: 350, 1: 500, 3: 410, 8: None}
+    assert cutoffs.averages == {2: 460.0, 7: sum(scores) / 7, 9: None}
+
+
 def test_required_coding_delta_for_written_gap() -> None:
     assert _required_coding_delta_for_written_gap(0) == 0
     assert _required_coding_delta_for_written_gap(1) == 3
@@ -31,7 +75,7 @@ def test_build_comeback_analysis_for_chasing_case() -> None:
     lines = _build_comeback_analysis(
         own_score=380,
         target_rank_score=400,
-        avg_top_202=395.45,
+        avg_top_target=395.45,
     )
     text = "\n".join(lines)
     assert "[202线] 目标初试400，当前差20分 -> 机考约+47分" in text
@@ -42,7 +86,7 @@ def test_build_comeback_analysis_for_ahead_case() -> None:
     lines = _build_comeback_analysis(
         own_score=405,
         target_rank_score=400,
-        avg_top_202=395.45,
+        avg_top_target=395.45,
     )
     text = "\n".join(lines)
     assert "[202线] 初试已不低于400 -> 机考约-12分仍可追平" in text
@@ -53,8 +97,41 @@ def test_build_comeback_analysis_no_hard_cap_for_large_gap() -> None:
     lines = _build_comeback_analysis(
         own_score=350,
         target_rank_score=378,
-        avg_top_202=470.0,
+        avg_top_target=470.0,
     )
     text = "\n".join(lines)
     assert "机考约+280分" in text
     assert "机考追分值不设上限" in text
+
+
+class _RosterBot:
+    async def call_api(self, api: str, **kwargs):
+        if api == "get_group_member_list":
+            filler = [{"user_id": uid, "card": f"{uid}-路人"} for uid in range(360, 400)]
+            return [{"user_id": 1, "card": "420-甲"}, {"user_id": 2, "card": "390-乙"}, *filler]
+        return {"user_id": kwargs["user_id"], "card": "401-丙"}
+
+
+@pytest.mark.asyncio
+async def test_rank_index_applies_roster_deltas_without_rescanning() -> None:
+    bot = _RosterBot()
+    roster = LiveRoster()
+    service = ScoreStatService(None, 24, 30, None, members=roster)  # type: ignore[arg-type]
+    members = await roster.get(bot, 100)
+    service.rank_index(100, members)
+
+    await roster.handle_notice(
+        bot, {"notice_type": "group_card", "group_id": 100, "user_id": 1, "card_new": "bad"}
+    )
+    await roster.handle_notice(bot, {"notice_type": "group_increase", "group_id": 100, "user_id": 3})
+    service.classifier.classify.cache_clear()
+    index = service.rank_index(100, await roster.get(bot, 100))
+
+    assert index.total == 42
+    assert index.score_at_rank(1) == 401
+    # Only the changed profiles (before and after) were classified, not the roster.
+    assert service.classifier.classify.cache_info().misses == 3
+
+    parsed, full = service.score_index(100, await roster.get(bot, 100))
+    assert sorted(parsed.scores)[-2:] == [399, 401]
+    assert full.counts == index.counts
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from qbot.sharding import assign_groups, run_sharded
+
+
+def test_assign_groups_spreads_primaries_and_respects_membership() -> None:
+    memberships = {"a": {1, 2, 3, 4}, "b": {1, 2, 3, 4, 5}, "c": None}
+    plan = assign_groups([1, 2, 3, 4, 5, 6], memberships)
+
+    primaries = [candidates[0] for candidates in plan.values()]
+    assert {primaries.count(bot) for bot in "abc"} == {2}
+    assert "a" not in plan[5]
+    assert plan[6] == ["c"]
+    assert set(plan[1]) == {"a", "b", "c"}
+
+
+def test_assign_groups_without_eligible_bot() -> None:
+    assert assign_groups([7], {"a": {1}}) == {7: []}
+
+
+@pytest.mark.asyncio
+async def test_run_sharded_bounds_concurrency_and_fails_over() -> None:
+    running = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+    served: dict[int, str] = {}
+    connected = {"a", "b"}
+
+    async def job(bot, group_id: int) -> bool:
+        running[bot] += 1
+        peak[bot] = max(peak[bot], running[bot])
+        await asyncio.sleep(0.01)
+        running[bot] -= 1
+        if bot == "a" and group_id == 3:
+            connected.discard("a")
+            return False
+        served[group_id] = bot
+        return True
+
+    groups = list(range(1, 9))
+    results = await run_sharded(
+        groups,
+        {"a": "a", "b": "b"},
+        {"a": set(groups), "b": set(groups)},
+        job,
+        concurrency_per_bot=2,
+        is_connected=lambda bot_id: bot_id in connected,
+    )
+
+    assert all(results.values())
+    assert max(peak.values()) <= 2
+    assert served[3] == "b"
+    assert set(served.values()) == {"a", "b"}
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from qbot.repository import ScoreRepository
+from qbot.usage import CommandUsageSink
+
+
+class _CountingRepository(ScoreRepository):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.batches: list[int] = []
+
+    async def log_command_usages(self, entries) -> None:
+        self.batches.append(len(entries))
+        await super().log_command_usages(entries)
+
+
+@pytest.mark.asyncio
+async def test_burst_is_written_in_one_batch(tmp_path) -> None:
+    repo = _CountingRepository(tmp_path / "qbot.sqlite3")
+    await repo.init()
+    sink = CommandUsageSink(repo, batch_size=100, flush_interval_seconds=60)
+    sink.start()
+
+    for _ in range(100):
+        sink.record(1, 2, "rank", "run")
+    for _ in range(20):
+        await asyncio.sleep(0.01)
+        if repo.batches:
+            break
+
+    assert repo.batches == [100]
+    assert await repo.get_command_usage_counts(1, 2) == [("rank", 100)]
+    await sink.close()
+    await repo.close()
+
+
+@pytest.mark.asyncio
+async def test_close_drains_pending_rows(tmp_path) -> None:
+    repo = _CountingRepository(tmp_path / "qbot.sqlite3")
+    await repo.init()
+    sink = CommandUsageSink(repo, batch_size=100, flush_interval_seconds=60)
+    sink.start()
+
+    sink.record(1, 2, "rank", "run")
+    sink.record(1, 2, "set", "run")
+    assert repo.batches == []
+
+    await sink.close()
+    assert sink.pending == 0
+    assert repo.batches == [2]
+    assert await repo.get_command_usage_counts(1, 2) == [("rank", 1), ("set", 1)]
+    await repo.close()